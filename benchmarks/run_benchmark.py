@@ -0,0 +1,143 @@
+"""
+Offline throughput benchmark for the SlideSage pipeline.
+
+Generates synthetic decks, runs process_pptx over them end to end against a
+stub Ollama server, and reports decks/sec, slides/sec, LLM calls per deck and
+peak memory. With --stub-parser, LibreOffice and Marker are replaced as well so
+the benchmark runs without either installed.
+
+    python -m benchmarks.run_benchmark --decks 5 --slides 30 --stub-parser
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from config.config import Config
+from src.utils.instrumentation import get_metrics
+from benchmarks.stub_ollama import StubOllamaServer
+from benchmarks.synthetic_decks import generate_decks
+
+
+def run_benchmark(args) -> dict:
+    """Run one benchmark configuration and return its results"""
+    import main
+    import src.pipeline
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="slidesage-bench-"))
+    input_dir = workdir / "input"
+    output_dir = workdir / "output"
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    decks = generate_decks(
+        input_dir, args.decks, slides=args.slides,
+        images_per_slide=args.images_per_slide, duplicate_ratio=args.duplicate_ratio
+    )
+
+    parser = None
+    if args.stub_parser:
+        from benchmarks.stubs import StubPdfParser, stub_convert_pptx_to_pdf
+
+        # Replace the LibreOffice step used by convert_stage
+        src.pipeline.convert_pptx_to_pdf = stub_convert_pptx_to_pdf
+        parser = StubPdfParser()
+
+    with StubOllamaServer(latency=args.llm_latency) as server:
+        config = Config(
+            input_dir=str(input_dir),
+            output_dir=str(output_dir),
+            ollama_url=server.url,
+            llm_concurrency=args.llm_concurrency,
+            summary_batch_size=args.summary_batch_size,
+            images_per_request=args.images_per_request,
+            llm_cache=args.llm_cache,
+            engine=args.engine,
+            desc_images=not args.no_desc_images,
+        )
+        config.ensure_dirs_exist()
+        multimodal_llm = src.pipeline.create_llm(config) if config.desc_images else None
+
+        errors = 0
+        start_time = time.perf_counter()
+        for deck in decks:
+            try:
+                if not main.process_pptx(deck, config, parser=parser, multimodal_llm=multimodal_llm):
+                    errors += 1
+            except Exception as e:
+                print(f"Error processing {deck.name}: {str(e)}")
+                errors += 1
+        elapsed = time.perf_counter() - start_time
+        llm_calls = dict(server.calls)
+
+    total_slides = args.decks * args.slides
+    results = {
+        "decks": args.decks,
+        "slides_per_deck": args.slides,
+        "images_per_slide": args.images_per_slide,
+        "duplicate_ratio": args.duplicate_ratio,
+        "llm_latency": args.llm_latency,
+        "llm_concurrency": args.llm_concurrency,
+        "summary_batch_size": args.summary_batch_size,
+        "images_per_request": args.images_per_request,
+        "stub_parser": args.stub_parser,
+        "errors": errors,
+        "elapsed_seconds": elapsed,
+        "decks_per_second": args.decks / elapsed if elapsed else 0.0,
+        "slides_per_second": total_slides / elapsed if elapsed else 0.0,
+        "llm_calls": llm_calls,
+        "llm_calls_per_deck": sum(llm_calls.values()) / args.decks if args.decks else 0.0,
+        "peak_rss_bytes": get_metrics().run_peak_rss_bytes(),
+        "stages": get_metrics().snapshot()["stages"],
+    }
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline SlideSage throughput benchmark")
+    parser.add_argument("--decks", type=int, default=3, help="Number of synthetic decks")
+    parser.add_argument("--slides", type=int, default=20, help="Slides per deck")
+    parser.add_argument("--images-per-slide", type=int, default=2, help="Pictures per slide")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3,
+                        help="Probability a picture repeats an earlier one")
+    parser.add_argument("--llm-latency", type=float, default=0.05,
+                        help="Seconds the stub Ollama waits before each response")
+    parser.add_argument("--llm-concurrency", type=int, default=4,
+                        help="Maximum Ollama requests in flight")
+    parser.add_argument("--summary-batch-size", type=int, default=1,
+                        help="Slides summarized per request")
+    parser.add_argument("--images-per-request", type=int, default=1,
+                        help="Images described per vision request")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="Enable the LLM cache (off by default so every call is measured)")
+    parser.add_argument("--engine", default="marker", choices=["marker", "pptx"],
+                        help="Extraction engine")
+    parser.add_argument("--no-desc-images", action="store_true",
+                        help="Skip the LLM enrichment stage")
+    parser.add_argument("--stub-parser", action="store_true",
+                        help="Replace LibreOffice and Marker with in-process stubs")
+    parser.add_argument("--workdir", default=None,
+                        help="Keep decks and outputs here instead of a temporary directory")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+
+    print(f"\nBenchmark complete!")
+    print(f"Decks/sec: {results['decks_per_second']:.2f}")
+    print(f"Slides/sec: {results['slides_per_second']:.2f}")
+    print(f"LLM calls per deck: {results['llm_calls_per_deck']:.1f}")
+    print(f"Peak memory: {results['peak_rss_bytes'] / (1024 * 1024):.1f} MiB")
+    print(f"Errors: {results['errors']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
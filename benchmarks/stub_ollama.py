@@ -0,0 +1,108 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOllamaServer:
+    """
+    Local HTTP server answering Ollama's /api/chat, /api/generate and /api/embeddings
+    with canned output after a configurable delay, counting the calls it receives.
+    """
+
+    def __init__(self, latency: float = 0.05, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            latency: Seconds to wait before each response, standing in for inference time
+            host: Interface to bind
+            port: Port to bind (default: any free port)
+        """
+        self.latency = latency
+        self.calls = {}
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                body = stub.respond(self.path, payload)
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def respond(self, path: str, payload: dict):
+        """Build the response for one request"""
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+        time.sleep(self.latency)
+
+        if path == "/api/chat":
+            content = "A stub one-sentence answer."
+            prompt = payload.get("messages", [{}])[-1].get("content", "")
+            batch = re.match(r"Summarize each of the following (\d+) slides", prompt)
+            if batch:
+                content = json.dumps([f"A stub summary of slide {i + 1}." for i in range(int(batch.group(1)))])
+            return {
+                "model": payload.get("model"),
+                "message": {"role": "assistant", "content": content},
+                "done": True,
+            }
+        if path == "/api/generate":
+            response = "A stub description of the image."
+            images = payload.get("images") or []
+            if len(images) > 1:
+                response = json.dumps([f"A stub description of image {i + 1}." for i in range(len(images))])
+            return {
+                "model": payload.get("model"),
+                "response": response,
+                "done": True,
+            }
+        if path == "/api/embeddings":
+            # Hashed bag of words, so texts sharing words come out similar
+            vector = [0.0] * 64
+            for word in re.findall(r"\w+", payload.get("prompt", "").lower()):
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1.0
+            return {"embedding": vector}
+        return None
+
+    @property
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,81 @@
+import io
+import random
+from pathlib import Path
+from typing import List
+
+
+def _make_image(rng: random.Random, size=(640, 480)) -> bytes:
+    """Render a random picture of rectangles as JPEG bytes"""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+        x1, y1 = x0 + rng.randrange(20, 200), y0 + rng.randrange(20, 200)
+        draw.rectangle([x0, y0, x1, y1], fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def generate_deck(path: Path, slides: int = 20, images_per_slide: int = 2,
+                  duplicate_ratio: float = 0.3, seed: int = 0) -> Path:
+    """
+    Write a synthetic PPTX deck.
+
+    Args:
+        path: Where to save the deck
+        slides: Number of slides
+        images_per_slide: Pictures placed on every slide
+        duplicate_ratio: Probability that a picture repeats one already used
+                         (like a logo or footer), exercising caching and dedup
+        seed: Random seed, so runs are reproducible
+
+    Returns:
+        Path to the written deck
+    """
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+
+    rng = random.Random(seed)
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]  # Title and Content
+    used_images: List[bytes] = []
+
+    for index in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Section {index + 1}: synthetic topic {rng.randrange(1000)}"
+        body = slide.placeholders[1].text_frame
+        body.text = f"Key point {index + 1} about storage, pricing and operations."
+        for bullet in range(3):
+            paragraph = body.add_paragraph()
+            paragraph.text = f"Detail {bullet + 1}: " + " ".join(
+                rng.choice(["secure", "flexible", "cost", "space", "access", "growth", "urban"])
+                for _ in range(8)
+            )
+            paragraph.font.size = Pt(16)
+
+        for picture in range(images_per_slide):
+            if used_images and rng.random() < duplicate_ratio:
+                blob = rng.choice(used_images)
+            else:
+                blob = _make_image(rng)
+                used_images.append(blob)
+            slide.shapes.add_picture(
+                io.BytesIO(blob), Inches(0.5 + 3 * picture), Inches(5.2), width=Inches(2.5)
+            )
+
+        slide.notes_slide.notes_text_frame.text = f"Speaker notes for slide {index + 1}."
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    presentation.save(str(path))
+    return path
+
+
+def generate_decks(directory: Path, decks: int, **kwargs) -> List[Path]:
+    """Write several synthetic decks with distinct seeds"""
+    return [
+        generate_deck(Path(directory) / f"synthetic_{index:03d}.pptx", seed=index, **kwargs)
+        for index in range(decks)
+    ]
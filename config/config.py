@@ -1,6 +1,12 @@
-from dataclasses import dataclass
+import os
+from dataclasses import dataclass, field
 from pathlib import Path
 
+def _default_ollama_url() -> str:
+    """Use OLLAMA_HOST (as set in docker-compose) when present; may list several hosts"""
+    hosts = os.environ.get("OLLAMA_HOST", "http://localhost:11434").split(",")
+    return ",".join(host if "://" in host else f"http://{host}" for host in map(str.strip, hosts) if host)
+
 @dataclass
 class Config:
     # Input/Output settings
@@ -8,14 +14,69 @@ class Config:
     output_dir: str = "output"
     
     # LLM settings
-    ollama_url: str = "http://localhost:11434"
+    ollama_url: str = field(default_factory=_default_ollama_url)  # Comma separated to balance across servers
     model_name: str = "gemma3:4b"
+    # Requests in flight per Ollama server; match the server's OLLAMA_NUM_PARALLEL
+    llm_concurrency: int = field(
+        default_factory=lambda: int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+    )
+    
+    summary_batch_size: int = 1     # Slides summarized per request (1 = one request per slide)
+    summary_token_budget: int = 2000  # Approximate slide text tokens per batched summary request
+    
+    max_image_side: int = 896       # Downscale images to this longest side before sending (0 = original)
+    images_per_request: int = 1     # Images described per vision request
+    llm_timeout: float = 300.0      # Seconds before an Ollama request is abandoned and retried
+    llm_retries: int = 3            # Retries with exponential backoff after timeouts and 429/5xx
+    
+    # LLM cache settings
+    llm_cache: bool = True          # Reuse descriptions/summaries for unchanged images and text
+    llm_cache_size_mb: int = 256    # Size bound before least recently used entries are evicted
+    cache_dir: str = ""             # Defaults to <output_dir>/.slidesage_cache
+    
+    # Near-duplicate image settings
+    dedup_images: bool = True       # Describe one representative per group of near-duplicate images
+    dedup_threshold: int = 6        # Maximum Hamming distance between 64-bit perceptual hashes
+    dedup_scope: str = "deck"       # Group within each deck ("deck") or across the whole run ("run")
     
     # Processing flags
+    engine: str = "marker"    # "marker" (PDF + Marker for every slide) or "pptx" (native text, Marker for image-heavy slides)
     desc_images: bool = True  # Whether to generate image descriptions
     force_ocr: bool = True    # Whether to force OCR on all text
+    adaptive_ocr: bool = False  # Decide per page: OCR only pages without a usable text layer
     output_format: str = "markdown"  # Output format (markdown, html, etc.)
     langs: str = "en"         # Language for processing
+    metadata_format: str = "json"  # "json" (one document) or "jsonl" (one slide per line, written as enriched)
+    stream_pages: bool = False  # Parse and write a few pages at a time to bound memory
+    stream_chunk_pages: int = 4 # Pages per Marker call when streaming
+    image_writers: int = 4      # Threads encoding and writing extracted images
+    
+    # Parallelism settings
+    workers: int = 1          # Number of worker processes for multi-deck runs
+    pipeline: bool = False    # Overlap conversion, parsing and LLM enrichment across decks
+    queue_depth: int = 2      # Maximum decks waiting between pipeline stages
+    office_instances: int = 0 # Warm LibreOffice instances (0 = one soffice run per deck)
+    
+    # Incremental settings
+    force: bool = False       # Reprocess every deck, ignoring the run manifest
+    
+    # Service settings
+    server_host: str = "127.0.0.1"  # Address the --serve HTTP API binds to
+    server_port: int = 8765
+    server_workers: int = 2         # Jobs in progress at once in server mode
+    server_max_upload_mb: int = 200
+    server_job_retention_hours: float = 24.0  # Finished jobs and their outputs are dropped after this (0 = keep)
+    watch: bool = False             # Keep running and process decks as they arrive
+    watch_settle_seconds: float = 2.0
+    watch_poll_interval: float = 1.0
+    
+    # Search index settings
+    embedding_model: str = ""       # Defaults to the index's model, or nomic-embed-text for a new index
+    index_dir: str = ""             # Defaults to <output_dir>/.slidesage_index
+    
+    # Instrumentation settings
+    prometheus: bool = False  # Also write the run report in Prometheus text format
+    profile: bool = False     # Dump cProfile stats per stage and deck
     
     # Path settings
     @property
@@ -26,6 +87,14 @@ class Config:
     def output_path(self) -> Path:
         return Path(self.output_dir)
     
+    @property
+    def cache_path(self) -> Path:
+        return Path(self.cache_dir) if self.cache_dir else self.output_path / ".slidesage_cache"
+    
+    @property
+    def index_path(self) -> Path:
+        return Path(self.index_dir) if self.index_dir else self.output_path / ".slidesage_index"
+    
     def ensure_dirs_exist(self):
         """Ensure all required directories exist"""
         self.input_path.mkdir(parents=True, exist_ok=True)
@@ -1,63 +1,309 @@
 import argparse
+import multiprocessing
+import os
+import queue
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from src.parser import MarkerPdfParser
+from src.manifest import ALL_STAGES, RunManifest, deck_outputs
+from src.pipeline import (DeckJob, StagedPipeline, prepare_outputs, convert_stage, parse_stage,
+                          write_stage, enrich_stage, create_llm)
+from src.utils.instrumentation import get_metrics
 from src.utils.multimodal_llm import MultimodalLLM
-from src.utils.generate_metadata import generate_metadata
-from src.libre_pptx_to_pdf import convert_pptx_to_pdf
 from config.config import Config, default_config
 
-def process_pptx(pptx_path: Path, config: Config) -> bool:
-    """Process a single PPTX file"""
-    file_base = pptx_path.stem
-    pdf_path = convert_pptx_to_pdf(str(pptx_path))
-    
-    # Create output directory structure
-    file_output_dir = config.output_path / file_base
-    file_output_dir.mkdir(parents=True, exist_ok=True)
-    
-    image_dir = file_output_dir / "images"
-    image_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Initialize parser and process the file
-    parser = MarkerPdfParser()
-    result = parser.parse(
-        file_path=str(pdf_path),
-        output_format=config.output_format,
-        langs=config.langs,
-        extracted_image_dir=str(image_dir),
-        force_ocr=config.force_ocr,
-    )
+def process_pptx(pptx_path: Path, config: Config, parser: MarkerPdfParser = None,
+                 multimodal_llm: MultimodalLLM = None, stages: tuple = ALL_STAGES) -> bool:
+    """Process a single PPTX file, reusing a warm parser and LLM client when given"""
+    job = DeckJob(pptx_path=pptx_path, stages=stages)
+    get_metrics().start_deck(job.name)
+    prepare_outputs(job, config)
+    
+    if "convert" in stages:
+        convert_stage(job, config)
     
-    if not result["success"]:
-        print(f"Error processing {pptx_path.name}: {result.get('error')}")
-        return False
-    
-    # Save images and update markdown content
-    markdown_content = result["content"]
-    if "images" in result:
-        for img_name, img_obj in result["images"].items():
-            img_path = image_dir / img_name
-            img_obj.save(str(img_path))
-            markdown_content = markdown_content.replace(
-                f"![]({img_name})", 
-                f"![](images/{img_name})"
-            )
-    
-    # Save markdown content
-    markdown_path = file_output_dir / f"{file_base}.md"
-    with open(markdown_path, "w", encoding="utf-8") as f:
-        f.write(markdown_content)
+    if "parse" in stages:
+        # Reuse the caller's parser so the Marker models are loaded once per run
+        if parser is None:
+            parser = MarkerPdfParser()
+        try:
+            parse_stage(job, config, parser)
+        except RuntimeError as e:
+            print(f"Error processing {pptx_path.name}: {str(e)}")
+            return False
+    
+    # Save images and markdown content
+    if "write" in stages:
+        write_stage(job, config)
     
     # Generate metadata if enabled
+    if config.desc_images and "enrich" in stages:
+        enrich_stage(job, config, multimodal_llm)
+    
+    return True
+
+# Warm parser and LLM client owned by each pool worker process
+_worker_parser = None
+_worker_llm = None
+
+def _init_worker(config: Config):
+    """Load the Marker models once when a pool worker starts"""
+    global _worker_parser, _worker_llm
+    if config.profile:
+        get_metrics().enable_profiling(config.output_path / "profiles")
+    _worker_parser = MarkerPdfParser()
     if config.desc_images:
-        multimodal_llm = MultimodalLLM(
-            model_name=config.model_name,
-            base_url=config.ollama_url
+        _worker_llm = create_llm(config)
+    try:
+        _worker_parser.artifact_dict
+    except Exception as e:
+        # Leave the error to surface per deck from parse()
+        print(f"Worker {os.getpid()} failed to load models: {str(e)}")
+
+def _process_in_worker(job: DeckJob, config: Config):
+    """Process one deck inside a pool worker, isolating any failure to that deck"""
+    try:
+        success = process_pptx(job.pptx_path, config, parser=_worker_parser,
+                               multimodal_llm=_worker_llm, stages=job.stages)
+    except Exception as e:
+        print(f"Error processing {job.name}: {str(e)}")
+        success = False
+    # Ship this deck's metrics back to the parent's run report
+    return success, os.getpid(), _worker_parser.registry.load_time, get_metrics().drain()
+
+def run_serial(jobs, config: Config, on_success=None):
+    """
+    Process decks one after another in this process.
+    
+    Args:
+        jobs: DeckJobs to process
+        config: Run configuration
+        on_success: Called with each deck that completes
+    
+    Returns:
+        Tuple of (processed count, error count, model load times)
+    """
+    processed_count = 0
+    error_count = 0
+    pdf_parser = MarkerPdfParser()
+    multimodal_llm = create_llm(config) if config.desc_images else None
+    
+    for job in jobs:
+        try:
+            success = process_pptx(job.pptx_path, config, parser=pdf_parser,
+                                   multimodal_llm=multimodal_llm, stages=job.stages)
+        except Exception as e:
+            # One bad deck must not end the run, or a --watch daemon
+            print(f"Error processing {job.name}: {str(e)}")
+            success = False
+        if success:
+            processed_count += 1
+            if on_success is not None:
+                on_success(job)
+        else:
+            error_count += 1
+    
+    load_times = [pdf_parser.registry.load_time] if pdf_parser.registry.loaded else []
+    return processed_count, error_count, load_times
+
+def run_parallel(jobs, config: Config, on_success=None):
+    """
+    Process decks on a pool of worker processes, each holding warm Marker models.
+    
+    Args:
+        jobs: DeckJobs to process
+        config: Run configuration
+        on_success: Called in this process with each deck that completes
+    
+    Returns:
+        Tuple of (processed count, error count, model load time per worker)
+    """
+    processed_count = 0
+    error_count = 0
+    load_times = {}
+    
+    # spawn keeps torch state out of the children; each worker loads its own models
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=config.workers, mp_context=context,
+                             initializer=_init_worker, initargs=(config,)) as executor:
+        futures = {
+            executor.submit(_process_in_worker, job, config): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                success, pid, load_time, metrics = future.result()
+                load_times[pid] = load_time
+                get_metrics().merge(metrics)
+            except Exception as e:
+                print(f"Error processing {job.name}: {str(e)}")
+                success = False
+            if success:
+                processed_count += 1
+                if on_success is not None:
+                    on_success(job)
+            else:
+                error_count += 1
+    
+    return processed_count, error_count, [t for t in load_times.values() if t]
+
+def run_pipelined(jobs, config: Config, on_success=None):
+    """
+    Process decks through the staged pipeline so conversion, parsing and
+    LLM enrichment of different decks overlap.
+    
+    Args:
+        jobs: DeckJobs to process
+        config: Run configuration
+        on_success: Called with each deck that completes
+    
+    Returns:
+        Tuple of (processed count, error count, model load times)
+    """
+    pipeline = StagedPipeline(config, on_success=on_success)
+    processed_count, error_count = pipeline.run(jobs)
+    pipeline.report()
+    
+    registry = pipeline.parser.registry
+    load_times = [registry.load_time] if registry.loaded else []
+    return processed_count, error_count, load_times
+
+def plan_deck(pptx_path: Path, config: Config, manifest: RunManifest, selected: tuple = ALL_STAGES):
+    """
+    Decide which of the selected stages a deck needs.
+    
+    Returns:
+        Tuple of (stages to run, content hash, reason when nothing runs)
+    """
+    stages, content_hash = manifest.plan(pptx_path, config)
+    if config.force:
+        stages = ALL_STAGES
+    needed = stages
+    stages = tuple(stage for stage in stages if stage in selected)
+    if not stages:
+        return (), content_hash, "up to date" if not needed else "only unselected stages needed"
+    if "write" not in stages:
+        # Metadata only: the markdown from an earlier run has to be current
+        markdown = deck_outputs(pptx_path, config)["markdown"]
+        if not os.path.exists(markdown) or ("parse" in needed and not config.force):
+            return (), content_hash, "markdown missing or out of date; select convert,parse,write too"
+    return stages, content_hash, None
+
+def plan_jobs(pptx_paths, config: Config, manifest: RunManifest, selected: tuple = ALL_STAGES):
+    """
+    Build the jobs for a run, leaving out decks the manifest shows are up to date.
+    
+    Returns:
+        Tuple of (jobs to run, number of skipped decks)
+    """
+    jobs = []
+    skipped_count = 0
+    for pptx_path in pptx_paths:
+        stages, content_hash, _ = plan_deck(pptx_path, config, manifest, selected)
+        if not stages:
+            skipped_count += 1
+            continue
+        jobs.append(DeckJob(pptx_path=pptx_path, stages=stages, content_hash=content_hash))
+    return jobs, skipped_count
+
+def print_plan(pptx_paths, config: Config, manifest: RunManifest, selected: tuple = ALL_STAGES):
+    """List the work a run would do without loading models or calling the LLM"""
+    planned = 0
+    for pptx_path in pptx_paths:
+        stages, _, reason = plan_deck(pptx_path, config, manifest, selected)
+        if stages:
+            planned += 1
+            print(f"{pptx_path.name}: {', '.join(stages)}")
+        else:
+            print(f"{pptx_path.name}: skip ({reason})")
+    print(f"\n{planned} of {len(pptx_paths)} decks would be processed")
+
+def parse_stages(value: str) -> tuple:
+    """Parse --stages into stage names in processing order"""
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(ALL_STAGES)
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage(s): {', '.join(sorted(unknown))} (choose from {', '.join(ALL_STAGES)})"
         )
-        generate_metadata(str(markdown_path), multimodal_llm)
+    # The first three hand the parsed deck to each other in memory
+    markdown_stages = {"convert", "parse", "write"}
+    if names & markdown_stages and not markdown_stages <= names:
+        raise argparse.ArgumentTypeError("convert, parse and write can only be selected together")
+    return tuple(stage for stage in ALL_STAGES if stage in names)
+
+def watch_jobs(config: Config, manifest: RunManifest, counts: dict, selected: tuple = ALL_STAGES):
+    """
+    Yield a job for every deck that lands or changes in the input directory
+    until interrupted, leaving out decks the manifest shows are up to date.
     
-    return True
+    Args:
+        config: Run configuration
+        manifest: Run manifest used to plan each deck
+        counts: Receives the number of skipped decks under "skipped"
+        selected: Stages the run is limited to
+    """
+    from src.watcher import FolderWatcher
+    
+    ready = queue.Queue()
+    watcher = FolderWatcher(config.input_path, ready.put,
+                            settle_seconds=config.watch_settle_seconds,
+                            poll_interval=config.watch_poll_interval)
+    watcher.start()
+    print(f"Watching {config.input_path} ({watcher.mode}); press Ctrl+C to stop")
+    try:
+        while True:
+            pptx_path = ready.get()
+            stages, content_hash, reason = plan_deck(pptx_path, config, manifest, selected)
+            if not stages:
+                counts["skipped"] = counts.get("skipped", 0) + 1
+                print(f"Skipping {pptx_path.name}: {reason}")
+                continue
+            print(f"Queued {pptx_path.name}")
+            yield DeckJob(pptx_path=pptx_path, stages=stages, content_hash=content_hash)
+    except KeyboardInterrupt:
+        print("\nStopping watch")
+    finally:
+        watcher.stop()
+
+def run_query(config: Config, text: str, top_k: int):
+    """Print the slides most similar to a text query"""
+    from src.search_index import VectorIndex
+    
+    index = VectorIndex(config.index_path)
+    if not index.count:
+        print(f"Search index at {config.index_path} is empty; build it with --index")
+        return
+    multimodal_llm = create_llm(config)
+    try:
+        start_time = time.time()
+        results = index.query(text, multimodal_llm, config.embedding_model or None, k=top_k)
+        elapsed = time.time() - start_time
+    except ValueError as e:
+        print(f"Error querying search index: {str(e)}")
+        return
+    finally:
+        multimodal_llm.close()
+    for rank, result in enumerate(results, 1):
+        summary = result["summary"] or "(no summary)"
+        print(f"{rank:>2}. {result['score']:.3f}  {result['deck']} slide {result['slide']}: {summary}")
+    print(f"{len(results)} results from {index.count} slides in {elapsed * 1000:.0f} ms")
+
+def update_index(config: Config, index, metadata_paths, prune: bool = True):
+    """Embed new or changed metadata into the search index"""
+    multimodal_llm = create_llm(config)
+    try:
+        stats = index.update(metadata_paths, multimodal_llm, config.embedding_model or None, prune=prune)
+    except Exception as e:
+        print(f"Error updating search index: {str(e)}")
+        return
+    finally:
+        multimodal_llm.close()
+    if stats["decks"] or stats["removed"]:
+        print(f"Search index: {stats['decks']} decks embedded ({stats['slides']} slides), "
+              f"{stats['removed']} removed")
 
 def main():
     parser = argparse.ArgumentParser(description="Process PPTX files and extract content")
@@ -70,20 +316,113 @@ def main():
     
     # LLM settings
     parser.add_argument("--ollama-url", default=default_config.ollama_url,
-                       help="URL of the Ollama server")
+                       help="URL of the Ollama server, or several comma separated to spread requests across them")
     parser.add_argument("--model-name", default=default_config.model_name,
                        help="Name of the model to use")
+    parser.add_argument("--llm-concurrency", type=int, default=default_config.llm_concurrency,
+                       help="Maximum Ollama requests in flight per server; match OLLAMA_NUM_PARALLEL")
+    parser.add_argument("--summary-batch-size", type=int, default=default_config.summary_batch_size,
+                       help="Slides summarized per request (1 = one request per slide)")
+    parser.add_argument("--summary-token-budget", type=int, default=default_config.summary_token_budget,
+                       help="Approximate slide text tokens packed into one batched summary request")
+    parser.add_argument("--max-image-side", type=int, default=default_config.max_image_side,
+                       help="Downscale images to this longest side before sending (0 = send originals)")
+    parser.add_argument("--images-per-request", type=int, default=default_config.images_per_request,
+                       help="Images described per vision request")
+    parser.add_argument("--llm-timeout", type=float, default=default_config.llm_timeout,
+                       help="Seconds before an Ollama request is abandoned and retried")
+    parser.add_argument("--llm-retries", type=int, default=default_config.llm_retries,
+                       help="Retries with exponential backoff after timeouts, connection errors and 429/5xx")
     
     # Processing flags
     parser.add_argument("--no-desc-images", action="store_true",
                        help="Disable image description generation")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                       help="Disable the on-disk cache of image descriptions and summaries")
+    parser.add_argument("--llm-cache-size-mb", type=int, default=default_config.llm_cache_size_mb,
+                       help="Size bound of the LLM cache before LRU eviction")
+    parser.add_argument("--cache-dir", default=default_config.cache_dir,
+                       help="Directory for caches (default: <output-dir>/.slidesage_cache)")
+    parser.add_argument("--no-dedup-images", action="store_true",
+                       help="Describe every image, even near-duplicates")
+    parser.add_argument("--dedup-threshold", type=int, default=default_config.dedup_threshold,
+                       help="Maximum perceptual hash distance for near-duplicate images")
+    parser.add_argument("--dedup-scope", default=default_config.dedup_scope,
+                       choices=["deck", "run"],
+                       help="Group near-duplicate images within each deck or across the run")
+    parser.add_argument("--engine", default=default_config.engine,
+                       choices=["marker", "pptx"],
+                       help="Extraction engine: Marker for every slide, or native PPTX with Marker only for image-heavy slides")
     parser.add_argument("--no-force-ocr", action="store_true",
                        help="Disable forced OCR")
+    parser.add_argument("--adaptive-ocr", action="store_true",
+                       help="Decide OCR per page: skip it on pages with a usable embedded text layer")
     parser.add_argument("--output-format", default=default_config.output_format,
                        choices=["markdown", "html"],
                        help="Output format for processed files")
     parser.add_argument("--langs", default=default_config.langs,
                        help="Languages for processing")
+    parser.add_argument("--metadata-format", default=default_config.metadata_format,
+                       choices=["json", "jsonl"],
+                       help="Metadata as one JSON document, or JSONL with one slide per line written as it is enriched")
+    parser.add_argument("--stream-pages", action="store_true",
+                       help="Parse and write a few pages at a time so memory stays flat on huge decks")
+    parser.add_argument("--stream-chunk-pages", type=int, default=default_config.stream_chunk_pages,
+                       help="Pages per Marker call when streaming")
+    parser.add_argument("--image-writers", type=int, default=default_config.image_writers,
+                       help="Threads encoding and writing extracted images")
+    parser.add_argument("--workers", type=int, default=default_config.workers,
+                       help="Number of worker processes (each loads the models once)")
+    parser.add_argument("--pipeline", action="store_true",
+                       help="Overlap conversion, parsing, writing and LLM enrichment across decks")
+    parser.add_argument("--queue-depth", type=int, default=default_config.queue_depth,
+                       help="Maximum decks waiting between pipeline stages")
+    parser.add_argument("--office-instances", type=int, default=default_config.office_instances,
+                       help="Warm headless LibreOffice instances to convert with (0 = one soffice run per deck)")
+    parser.add_argument("--force", action="store_true",
+                       help="Reprocess every deck, ignoring the run manifest")
+    parser.add_argument("--stages", type=parse_stages, default=ALL_STAGES,
+                       help="Comma separated stages to run, e.g. 'enrich' to regenerate metadata from "
+                            "existing markdown (choices: " + ", ".join(ALL_STAGES) + ")")
+    parser.add_argument("--dry-run", action="store_true",
+                       help="List the stages each deck would run and exit without processing")
+    parser.add_argument("--watch", action="store_true",
+                       help="Keep running and process decks as they land in the input directory")
+    parser.add_argument("--watch-settle", type=float, default=default_config.watch_settle_seconds,
+                       help="Seconds a file must stay unchanged before it is processed")
+    parser.add_argument("--watch-poll-interval", type=float, default=default_config.watch_poll_interval,
+                       help="Seconds between checks of the input directory")
+    
+    # Search index
+    parser.add_argument("--index", action="store_true",
+                       help="Embed new or changed slide metadata into the search index after processing")
+    parser.add_argument("--query", default=None,
+                       help="Search the slide index for this text and exit")
+    parser.add_argument("--top-k", type=int, default=10,
+                       help="Number of search results")
+    parser.add_argument("--embedding-model", default=default_config.embedding_model,
+                       help="Ollama model used to embed slides and queries "
+                            "(default: the index's model, or nomic-embed-text for a new index)")
+    parser.add_argument("--index-dir", default=default_config.index_dir,
+                       help="Directory of the search index (default: <output-dir>/.slidesage_index)")
+    
+    # Server mode
+    parser.add_argument("--serve", action="store_true",
+                       help="Run as a long-lived HTTP service with warm models instead of a batch run")
+    parser.add_argument("--host", default=default_config.server_host,
+                       help="Address the HTTP service binds to")
+    parser.add_argument("--port", type=int, default=default_config.server_port,
+                       help="Port of the HTTP service")
+    parser.add_argument("--server-workers", type=int, default=default_config.server_workers,
+                       help="Jobs the HTTP service works on at once")
+    parser.add_argument("--job-retention-hours", type=float, default=default_config.server_job_retention_hours,
+                       help="Hours finished service jobs and their outputs are kept (0 = forever)")
+    
+    # Instrumentation
+    parser.add_argument("--prometheus", action="store_true",
+                       help="Also write the run report in Prometheus text format")
+    parser.add_argument("--profile", action="store_true",
+                       help="Dump cProfile stats per stage and deck to <output-dir>/profiles")
     
     args = parser.parse_args()
     
@@ -93,31 +432,141 @@ def main():
         output_dir=args.output_dir,
         ollama_url=args.ollama_url,
         model_name=args.model_name,
+        llm_concurrency=max(1, args.llm_concurrency),
+        summary_batch_size=max(1, args.summary_batch_size),
+        summary_token_budget=max(1, args.summary_token_budget),
+        max_image_side=max(0, args.max_image_side),
+        images_per_request=max(1, args.images_per_request),
+        llm_timeout=max(1.0, args.llm_timeout),
+        llm_retries=max(0, args.llm_retries),
         desc_images=not args.no_desc_images,
+        llm_cache=not args.no_llm_cache,
+        llm_cache_size_mb=args.llm_cache_size_mb,
+        cache_dir=args.cache_dir,
+        dedup_images=not args.no_dedup_images,
+        dedup_threshold=args.dedup_threshold,
+        dedup_scope=args.dedup_scope,
+        engine=args.engine,
         force_ocr=not args.no_force_ocr,
+        adaptive_ocr=args.adaptive_ocr,
         output_format=args.output_format,
-        langs=args.langs
+        langs=args.langs,
+        metadata_format=args.metadata_format,
+        stream_pages=args.stream_pages,
+        stream_chunk_pages=max(1, args.stream_chunk_pages),
+        image_writers=max(1, args.image_writers),
+        workers=max(1, args.workers),
+        pipeline=args.pipeline,
+        queue_depth=max(1, args.queue_depth),
+        office_instances=max(0, args.office_instances),
+        server_host=args.host,
+        server_port=args.port,
+        server_workers=max(1, args.server_workers),
+        server_job_retention_hours=args.job_retention_hours,
+        force=args.force,
+        watch=args.watch,
+        embedding_model=args.embedding_model,
+        index_dir=args.index_dir,
+        watch_settle_seconds=max(0.0, args.watch_settle),
+        watch_poll_interval=max(0.1, args.watch_poll_interval),
+        prometheus=args.prometheus,
+        profile=args.profile
     )
     
     # Ensure directories exist
     config.ensure_dirs_exist()
     
+    if config.profile:
+        get_metrics().enable_profiling(config.output_path / "profiles")
+    
+    if args.query is not None:
+        run_query(config, args.query, max(1, args.top_k))
+        return
+    
+    if args.serve:
+        from src.server import serve
+        serve(config)
+        return
+    
     # Process files
     start_time = time.time()
-    processed_count = 0
-    error_count = 0
     
-    for pptx_path in Path(config.input_dir).glob("*.pptx"):
-        if process_pptx(pptx_path, config):
-            processed_count += 1
+    # Skip decks whose content and settings match the last run
+    manifest = RunManifest(config.cache_path / "manifest.json")
+    watch_counts = {"skipped": 0}
+    if args.dry_run:
+        print_plan(sorted(config.input_path.glob("*.pptx")), config, manifest, args.stages)
+        return
+    if config.watch:
+        # Load the models before the first deck arrives
+        if "parse" in args.stages:
+            try:
+                MarkerPdfParser().artifact_dict
+            except Exception as e:
+                print(f"Failed to load models: {str(e)}")
+        jobs = watch_jobs(config, manifest, watch_counts, args.stages)
+        skipped_count = 0
+    else:
+        pptx_paths = sorted(config.input_path.glob("*.pptx"))
+        jobs, skipped_count = plan_jobs(pptx_paths, config, manifest, args.stages)
+    
+    index = None
+    if args.index:
+        from src.search_index import VectorIndex
+        index = VectorIndex(config.index_path)
+    
+    def record(job):
+        manifest.record(job.pptx_path, config, job.content_hash, job.stages)
+        if config.watch:
+            manifest.save()
+            if index is not None:
+                metadata_path = Path(deck_outputs(job.pptx_path, config)["metadata"])
+                if metadata_path.exists():
+                    update_index(config, index, [metadata_path], prune=False)
+    
+    try:
+        if config.watch:
+            # Decks arrive one at a time, so they are fed to a single warm process
+            run = run_pipelined if config.pipeline else run_serial
+            processed_count, error_count, load_times = run(jobs, config, on_success=record)
+        elif config.workers > 1 and len(jobs) > 1:
+            processed_count, error_count, load_times = run_parallel(jobs, config, on_success=record)
+        elif config.pipeline:
+            processed_count, error_count, load_times = run_pipelined(jobs, config, on_success=record)
         else:
-            error_count += 1
+            processed_count, error_count, load_times = run_serial(jobs, config, on_success=record)
+    finally:
+        manifest.save()
+    skipped_count += watch_counts["skipped"]
+    
+    if index is not None and not config.watch:
+        from src.search_index import find_metadata_files
+        update_index(config, index, find_metadata_files(config.output_path))
     
     # Print summary
     print(f"\nProcessing complete!")
     print(f"Processed files: {processed_count}")
+    print(f"Skipped (unchanged): {skipped_count}")
     print(f"Errors: {error_count}")
-    print(f"Total time: {time.time() - start_time:.2f} seconds")
+    if len(load_times) == 1:
+        print(f"Model load time: {load_times[0]:.2f} seconds (once per run)")
+    elif load_times:
+        print(f"Model load time: {sum(load_times):.2f} seconds "
+              f"(once per worker, {len(load_times)} workers)")
+    total_time = time.time() - start_time
+    print(f"Total time: {total_time:.2f} seconds")
+    
+    # Machine-readable run report
+    report_path = get_metrics().write_report(config.output_path / "run_report.json", extra={
+        "processed": processed_count,
+        "skipped": skipped_count,
+        "errors": error_count,
+        "total_time": total_time,
+        "model_load_times": load_times,
+    })
+    print(f"Run report: {report_path}")
+    if config.prometheus:
+        get_metrics().write_prometheus(config.output_path / "run_report.prom")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,293 @@
+import atexit
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Union
+
+from src.libre_pptx_to_pdf import convert_pptx_to_pdf, convert_pptx_batch_to_pdf
+
+
+def _uno_available() -> bool:
+    """The UNO bridge ships with LibreOffice's python and is not pip-installable"""
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class OfficeInstance:
+    """One warm headless office process with its own private user profile"""
+
+    def __init__(self, name: str, office_binary: str = "soffice", startup_timeout: float = 30.0):
+        """
+        Args:
+            name: Unique name for the instance's UNO pipe
+            office_binary: LibreOffice executable to launch
+            startup_timeout: Seconds to wait for the office to accept connections
+        """
+        self.name = name
+        self.office_binary = office_binary
+        self.startup_timeout = startup_timeout
+        self.profile_dir = tempfile.mkdtemp(prefix=f"slidesage-office-{name}-")
+        self.process = None
+        self.desktop = None
+
+    def start(self):
+        """Launch the office process and connect to it over a named pipe"""
+        import uno
+
+        cmd = [
+            self.office_binary, '--headless', '--invisible', '--nologo',
+            '--norestore', '--nodefault', '--nolockcheck',
+            f'--accept=pipe,name={self.name};urp;StarOffice.ComponentContext',
+            f'-env:UserInstallation={Path(self.profile_dir).as_uri()}',
+        ]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        deadline = time.time() + self.startup_timeout
+        while True:
+            try:
+                context = resolver.resolve(
+                    f"uno:pipe,name={self.name};urp;StarOffice.ComponentContext"
+                )
+                break
+            except Exception:
+                if self.process.poll() is not None or time.time() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"LibreOffice instance {self.name} failed to start")
+                time.sleep(0.25)
+
+        self.desktop = context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", context
+        )
+
+    def convert(self, input_path: str, output_path: str):
+        """Convert one presentation to PDF inside the running office"""
+        import uno
+        from com.sun.star.beans import PropertyValue
+
+        def prop(name, value):
+            p = PropertyValue()
+            p.Name = name
+            p.Value = value
+            return p
+
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(input_path)), "_blank", 0,
+            (prop("Hidden", True), prop("ReadOnly", True))
+        )
+        if document is None:
+            raise RuntimeError(f"LibreOffice could not open {input_path}")
+        try:
+            document.storeToURL(
+                uno.systemPathToFileUrl(os.path.abspath(output_path)),
+                (prop("FilterName", "impress_pdf_Export"),)
+            )
+        finally:
+            document.close(True)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        """Terminate the office process and remove its profile"""
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class LibreOfficeService:
+    """
+    Pool of warm headless LibreOffice instances that PPTX conversions are sent to.
+
+    Each instance runs with a private user profile so several can convert at once.
+    When the UNO bridge is unavailable, or an instance fails, conversions fall back
+    to ``convert_pptx_to_pdf`` with a private profile per call.
+    """
+
+    def __init__(self, instances: int = 1, office_binary: str = "soffice"):
+        """
+        Args:
+            instances: Number of office processes to keep warm
+            office_binary: LibreOffice executable to launch
+        """
+        self.instance_count = max(1, instances)
+        self.office_binary = office_binary
+        self._idle: "queue.Queue[OfficeInstance]" = queue.Queue()
+        self._instances: List[OfficeInstance] = []
+        self._lock = threading.Lock()
+        self._started = False
+        self.available = _uno_available()
+
+    def start(self):
+        """Start every office instance; safe to call more than once"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            if not self.available:
+                print("UNO bridge not found, using one LibreOffice subprocess per conversion")
+                return
+            for index in range(self.instance_count):
+                instance = OfficeInstance(f"slidesage_{os.getpid()}_{index}", self.office_binary)
+                try:
+                    instance.start()
+                except Exception as e:
+                    print(f"Error starting LibreOffice instance: {str(e)}")
+                    continue
+                self._instances.append(instance)
+                self._idle.put(instance)
+            if not self._instances:
+                self.available = False
+
+    def stop(self):
+        """Shut down every office instance"""
+        with self._lock:
+            for instance in self._instances:
+                instance.stop()
+            self._instances = []
+            self._idle = queue.Queue()
+            self._started = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _fallback(self, input_path: str, output_path: str) -> str:
+        profile_dir = tempfile.mkdtemp(prefix="slidesage-office-")
+        try:
+            return convert_pptx_to_pdf(input_path, output_path, user_profile=profile_dir)
+        finally:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+    def convert(self, input_path: Union[str, Path], output_path: Optional[str] = None) -> str:
+        """
+        Convert a PowerPoint file to PDF on a warm office instance.
+
+        Args:
+            input_path: Path to the input PowerPoint file
+            output_path: Path to save the output PDF file.
+                         If not provided, will use the same name as input with .pdf extension
+
+        Returns:
+            str: Path to the generated PDF file
+        """
+        input_path = str(input_path)
+        if output_path is None:
+            output_path = str(Path(input_path).with_suffix('.pdf'))
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+        self.start()
+        if not self.available:
+            return self._fallback(input_path, output_path)
+
+        instance = self._idle.get()
+        try:
+            if not instance.alive:
+                instance.stop()
+                instance.start()
+            instance.convert(input_path, output_path)
+            return output_path
+        except Exception as e:
+            print(f"LibreOffice instance {instance.name} failed on {input_path}: {str(e)}")
+            try:
+                instance.stop()
+                instance.start()
+            except Exception:
+                pass
+            return self._fallback(input_path, output_path)
+        finally:
+            self._idle.put(instance)
+
+    def convert_batch(self, input_paths: List[Union[str, Path]],
+                      output_dir: Optional[str] = None) -> List[Union[str, Exception]]:
+        """
+        Convert several presentations in one call, spread over the warm instances.
+
+        Args:
+            input_paths: Paths to the input PowerPoint files
+            output_dir: Directory for the PDFs (default: next to each input)
+
+        Returns:
+            List aligned with input_paths holding each PDF path, or the exception
+            raised for that file
+        """
+        def convert_one(input_path):
+            output_path = None
+            if output_dir is not None:
+                output_path = str(Path(output_dir) / f"{Path(input_path).stem}.pdf")
+            try:
+                return self.convert(input_path, output_path)
+            except Exception as e:
+                return e
+
+        self.start()
+        if not self.available:
+            return self._fallback_batch(input_paths, output_dir)
+
+        with ThreadPoolExecutor(max_workers=len(self._instances)) as executor:
+            return list(executor.map(convert_one, input_paths))
+
+    def _fallback_batch(self, input_paths, output_dir) -> List[Union[str, Exception]]:
+        """Convert each output directory's decks with one LibreOffice start"""
+        groups = {}
+        for index, input_path in enumerate(input_paths):
+            target_dir = output_dir or os.path.dirname(os.path.abspath(str(input_path)))
+            groups.setdefault(target_dir, []).append(index)
+
+        results: List[Union[str, Exception]] = [None] * len(input_paths)
+        for target_dir, indices in groups.items():
+            profile_dir = tempfile.mkdtemp(prefix="slidesage-office-")
+            try:
+                pdf_paths = convert_pptx_batch_to_pdf(
+                    [input_paths[i] for i in indices], target_dir, user_profile=profile_dir
+                )
+                for i, pdf_path in zip(indices, pdf_paths):
+                    results[i] = pdf_path if os.path.exists(pdf_path) else \
+                        RuntimeError(f"LibreOffice produced no PDF for {input_paths[i]}")
+            except Exception as e:
+                for i in indices:
+                    results[i] = e
+            finally:
+                shutil.rmtree(profile_dir, ignore_errors=True)
+        return results
+
+
+_default_service: Optional[LibreOfficeService] = None
+_default_service_lock = threading.Lock()
+
+
+def get_office_service(instances: int = 1) -> LibreOfficeService:
+    """Return the conversion service shared by this process, started on first use"""
+    global _default_service
+    if _default_service is None:
+        with _default_service_lock:
+            if _default_service is None:
+                _default_service = LibreOfficeService(instances=instances)
+                atexit.register(_default_service.stop)
+    return _default_service
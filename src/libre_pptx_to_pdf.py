@@ -2,7 +2,13 @@ from pathlib import Path
 import os
 import subprocess
 
-def convert_pptx_to_pdf(input_path, output_path=None):
+def _profile_args(user_profile):
+    """Point LibreOffice at a private user profile so concurrent runs don't collide"""
+    if user_profile is None:
+        return []
+    return [f'-env:UserInstallation={Path(user_profile).absolute().as_uri()}']
+
+def convert_pptx_to_pdf(input_path, output_path=None, user_profile=None):
     """
     Convert a PowerPoint file to PDF using LibreOffice.
     
@@ -10,6 +16,7 @@ def convert_pptx_to_pdf(input_path, output_path=None):
         input_path (str): Path to the input PowerPoint file
         output_path (str, optional): Path to save the output PDF file. 
                                    If not provided, will use the same name as input with .pdf extension
+        user_profile (str, optional): Directory for a private LibreOffice user profile
     
     Returns:
         str: Path to the generated PDF file
@@ -24,7 +31,8 @@ def convert_pptx_to_pdf(input_path, output_path=None):
         
         # Convert using LibreOffice
         cmd = [
-            'libreoffice', '--headless', '--convert-to', 'pdf',
+            'libreoffice', '--headless', *_profile_args(user_profile),
+            '--convert-to', 'pdf',
             '--outdir', os.path.dirname(output_path),
             input_path
         ]
@@ -40,5 +48,30 @@ def convert_pptx_to_pdf(input_path, output_path=None):
         
     except Exception as e:
         raise
+
+
+def convert_pptx_batch_to_pdf(input_paths, output_dir, user_profile=None):
+    """
+    Convert several PowerPoint files to PDF with a single LibreOffice start.
+    
+    Args:
+        input_paths (list): Paths to the input PowerPoint files
+        output_dir (str): Directory to save the output PDF files
+        user_profile (str, optional): Directory for a private LibreOffice user profile
+    
+    Returns:
+        list: Paths to the generated PDF files, aligned with input_paths
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cmd = [
+        'libreoffice', '--headless', *_profile_args(user_profile),
+        '--convert-to', 'pdf',
+        '--outdir', output_dir,
+        *[str(p) for p in input_paths]
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
     
+    if result.returncode != 0:
+        raise Exception(f"LibreOffice conversion failed: {result.stderr}")
     
+    return [str(Path(output_dir) / f"{Path(p).stem}.pdf") for p in input_paths]
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config.config import Config
+from src.utils.llm_cache import hash_file
+
+# Stages in processing order; "enrich" generates the metadata JSON
+ALL_STAGES = ("convert", "parse", "write", "enrich")
+METADATA_STAGES = ("enrich",)
+
+
+def parse_settings(config: Config) -> Dict[str, Any]:
+    """Settings that change the markdown and images produced for a deck"""
+    return {
+        "engine": config.engine,
+        "force_ocr": config.force_ocr,
+        "adaptive_ocr": config.adaptive_ocr,
+        "langs": config.langs,
+        "output_format": config.output_format,
+    }
+
+
+def llm_settings(config: Config) -> Dict[str, Any]:
+    """Settings that change the metadata produced for a deck"""
+    if not config.desc_images:
+        return {"desc_images": False}
+    return {
+        "desc_images": True,
+        "metadata_format": config.metadata_format,
+        "model_name": config.model_name,
+        "dedup_images": config.dedup_images,
+        "dedup_threshold": config.dedup_threshold,
+        "dedup_scope": config.dedup_scope,
+        "summary_batch_size": config.summary_batch_size,
+        "max_image_side": config.max_image_side,
+        "images_per_request": config.images_per_request,
+    }
+
+
+def deck_outputs(pptx_path: Path, config: Config) -> Dict[str, str]:
+    """Paths of the files a full run writes for a deck"""
+    output_dir = config.output_path / pptx_path.stem
+    metadata_suffix = "jsonl" if config.metadata_format == "jsonl" else "json"
+    return {
+        "markdown": str(output_dir / f"{pptx_path.stem}.md"),
+        "metadata": str(output_dir / f"{pptx_path.stem}_metadata.{metadata_suffix}"),
+        "images": str(output_dir / "images"),
+    }
+
+
+class RunManifest:
+    """
+    Record of what was produced for each deck, used to skip unchanged work.
+
+    Each entry holds the deck's content hash, the settings it was processed with
+    and the outputs written. A deck whose hash and settings match is skipped; when
+    only the LLM settings differ, only the metadata stage is rerun.
+    """
+
+    def __init__(self, path: Path, autosave_every: int = 25):
+        """
+        Args:
+            path: JSON file holding the manifest
+            autosave_every: Save after this many recorded decks (always saved by save())
+        """
+        self.path = Path(path)
+        self.autosave_every = autosave_every
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("decks", {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable manifest {self.path}: {str(e)}")
+
+    def plan(self, pptx_path: Path, config: Config, content_hash: Optional[str] = None) -> tuple:
+        """
+        Decide which stages a deck needs.
+
+        Args:
+            pptx_path: Path to the PPTX file
+            config: Run configuration
+            content_hash: Precomputed hash of the deck (computed when omitted)
+
+        Returns:
+            Tuple of (stages to run, content hash); no stages means the deck is up to date
+        """
+        if content_hash is None:
+            content_hash = hash_file(str(pptx_path))
+
+        with self._lock:
+            entry = self.entries.get(pptx_path.name)
+        if entry is None or entry.get("content_hash") != content_hash:
+            return ALL_STAGES, content_hash
+        if entry.get("parse_settings") != parse_settings(config):
+            return ALL_STAGES, content_hash
+
+        outputs = deck_outputs(pptx_path, config)
+        if not os.path.exists(outputs["markdown"]):
+            return ALL_STAGES, content_hash
+
+        metadata_current = not config.desc_images or (
+            entry.get("llm_settings") == llm_settings(config)
+            and os.path.exists(outputs["metadata"])
+        )
+        if not metadata_current:
+            return METADATA_STAGES, content_hash
+        return (), content_hash
+
+    def record(self, pptx_path: Path, config: Config, content_hash: str, stages: tuple = ALL_STAGES):
+        """
+        Record a successfully processed deck.
+
+        Args:
+            pptx_path: Path to the PPTX file
+            config: Run configuration
+            content_hash: Hash the deck was planned with
+            stages: Stages that ran; when the metadata stage was left out of a run
+                    that rewrote the markdown, the metadata is recorded as outdated
+        """
+        with self._lock:
+            previous = self.entries.get(pptx_path.name) or {}
+        if "enrich" in stages or not config.desc_images:
+            metadata_settings = llm_settings(config)
+        elif "parse" not in stages:
+            metadata_settings = previous.get("llm_settings")
+        else:
+            metadata_settings = None
+        entry = {
+            "content_hash": content_hash,
+            "parse_settings": parse_settings(config),
+            "llm_settings": metadata_settings,
+            "outputs": deck_outputs(pptx_path, config),
+            "processed_at": datetime.now().isoformat(),
+        }
+        with self._lock:
+            self.entries[pptx_path.name] = entry
+            self._unsaved += 1
+            should_save = self._unsaved >= self.autosave_every
+        if should_save:
+            self.save()
+
+    def save(self):
+        """Write the manifest atomically"""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"decks": self.entries}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._unsaved = 0
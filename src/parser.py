@@ -1,22 +1,185 @@
+import re
 import time
-from typing import Dict, Any, Optional
+import threading
+import unicodedata
+from typing import Dict, Any, List, Optional, Tuple
 import os
 
+# Marker's paginated output puts this line before every page
+PAGE_SEPARATOR = "-" * 48
+_PAGE_SPLIT = re.compile(r'\n\n\{(\d+)\}' + PAGE_SEPARATOR + r'\n\n')
+
+
+def paginate(pages: Dict[int, str]) -> str:
+    """Join page markdown in page order with Marker's page separators"""
+    return "".join(
+        f"\n\n{{{page_number}}}{PAGE_SEPARATOR}\n\n{pages[page_number]}"
+        for page_number in sorted(pages)
+    )
+
+
+def split_pages(content: str) -> Dict[int, str]:
+    """Split Marker's paginated markdown back into {page number: markdown}"""
+    parts = _PAGE_SPLIT.split("\n\n" + content.lstrip("\n"))
+    return {int(parts[i]): parts[i + 1].strip() for i in range(1, len(parts) - 1, 2)}
+
+
+def inspect_text_layer(file_path: str, min_chars: int = 20, max_garbled_ratio: float = 0.1,
+                       page_range: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Decide per page whether the PDF's embedded text layer is usable.
+
+    Args:
+        file_path: Path to the PDF file
+        min_chars: Pages with fewer text characters are treated as raster pages
+        max_garbled_ratio: Pages where more than this fraction of characters are
+                           replacement, control or private-use characters need OCR
+        page_range: Only inspect these pages (default: every page)
+
+    Returns:
+        One entry per inspected page with "page", "text_chars", "ocr" and "reason"
+    """
+    import pypdfium2 as pdfium
+
+    decisions = []
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        indices = range(len(pdf)) if page_range is None else [i for i in page_range if 0 <= i < len(pdf)]
+        for index in indices:
+            page = pdf[index]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range().strip()
+            textpage.close()
+            page.close()
+
+            if len(text) < min_chars:
+                ocr, reason = True, "no text layer"
+            else:
+                garbled = sum(
+                    1 for ch in text
+                    if ch == "\ufffd" or (unicodedata.category(ch) in ("Cc", "Co", "Cn") and not ch.isspace())
+                )
+                if garbled / len(text) > max_garbled_ratio:
+                    ocr, reason = True, "garbled text layer"
+                else:
+                    ocr, reason = False, "text layer"
+            decisions.append({"page": index, "text_chars": len(text), "ocr": ocr, "reason": reason})
+    finally:
+        pdf.close()
+    return decisions
+
+
+class ModelRegistry:
+    """Process-wide holder for the Marker models and the converters built on them"""
 
-class MarkerPdfParser:
     def __init__(self):
-        """Initialize the parser and load models once"""
-        try:
-            from marker.models import create_model_dict
-            self.artifact_dict = create_model_dict()
-        except ImportError as e:
-            raise ImportError(f"Required module not found: {str(e)}. Install with: pip install marker-pdf")
+        """Create an empty registry; models are loaded on first use"""
+        self._artifact_dict = None
+        self._converters: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.load_time = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._artifact_dict is not None
+
+    @property
+    def artifact_dict(self) -> Dict[str, Any]:
+        """Load the Marker layout/OCR/recognition weights once and return them"""
+        if self._artifact_dict is None:
+            with self._lock:
+                if self._artifact_dict is None:
+                    try:
+                        from marker.models import create_model_dict
+                    except ImportError as e:
+                        raise ImportError(f"Required module not found: {str(e)}. Install with: pip install marker-pdf")
+                    start_time = time.time()
+                    self._artifact_dict = create_model_dict()
+                    self.load_time = time.time() - start_time
+        return self._artifact_dict
+
+    def get_converter(self, output_format: str, force_ocr: bool, langs: Optional[str],
+                      page_range: Optional[List[int]] = None):
+        """
+        Return a long-lived PdfConverter for the given configuration.
+
+        Args:
+            output_format: Marker output format
+            force_ocr: Whether to force OCR on every page
+            langs: Comma separated languages (default: "en")
+            page_range: Only convert these pages. Such converters are specific to one
+                        document and are built fresh rather than cached.
+
+        Returns:
+            A PdfConverter that is reused for every call with the same configuration
+        """
+        lang_list = langs.split(",") if langs else ["en"]
+        if page_range is not None:
+            from marker.converters.pdf import PdfConverter
+
+            return PdfConverter(artifact_dict=self.artifact_dict, config={
+                "output_format": output_format,
+                "force_ocr": force_ocr,
+                "langs": lang_list,
+                "paginate_output": True,
+                "page_range": list(page_range),
+            })
+
+        key = (output_format, force_ocr, tuple(lang_list))
+        converter = self._converters.get(key)
+        if converter is None:
+            artifact_dict = self.artifact_dict
+            with self._lock:
+                converter = self._converters.get(key)
+                if converter is None:
+                    from marker.converters.pdf import PdfConverter
+
+                    config = {
+                        "output_format": output_format,
+                        "force_ocr": force_ocr,
+                        "langs": lang_list,
+                        "paginate_output": True,
+                    }
+                    converter = PdfConverter(artifact_dict=artifact_dict, config=config)
+                    self._converters[key] = converter
+        return converter
+
+
+_default_registry: Optional[ModelRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the model registry shared by every parser in this process"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = ModelRegistry()
+    return _default_registry
+
+
+class MarkerPdfParser:
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        """
+        Initialize the parser.
+
+        Args:
+            registry: Model registry to use (default: the process-wide registry).
+                      Models are loaded lazily on the first parse.
+        """
+        self.registry = registry or get_model_registry()
+
+    @property
+    def artifact_dict(self) -> Dict[str, Any]:
+        return self.registry.artifact_dict
 
     def parse(
         self,
         file_path: str,
         output_format: str = "markdown",
         extracted_image_dir: Optional[str] = None,
+        registry: Optional[ModelRegistry] = None,
         **kwargs,
     ):
         """
@@ -26,7 +189,8 @@ class MarkerPdfParser:
             file_path: Path to the PDF file
             output_format: Desired output format (default: "markdown")
             extracted_image_dir: Directory to save extracted images
-            **kwargs: Additional parameters for the specific parsing 
+            registry: Model registry to parse with (default: the parser's registry)
+            **kwargs: Additional parameters for the specific parsing
 
         Returns:
             Dictionary containing parsed content and metadata
@@ -34,11 +198,12 @@ class MarkerPdfParser:
         if not os.path.exists(file_path):
             return {"success": False, "error": f"File not found: {file_path}"}
 
-        
+
         result = self.parse_locally(
-                file_path, 
-                output_format, 
+                file_path,
+                output_format,
                 extracted_image_dir=extracted_image_dir,
+                registry=registry,
                 **kwargs
             )
         return result
@@ -50,43 +215,147 @@ class MarkerPdfParser:
         langs: Optional[str] = None,
         force_ocr: bool = False,
         extracted_image_dir: Optional[str] = None,
+        registry: Optional[ModelRegistry] = None,
+        page_range: Optional[List[int]] = None,
+        adaptive_ocr: bool = False,
         **kwargs,
     ) -> Dict[str, Any]:
-        """Parse PDF using local Marker library"""
+        """
+        Parse PDF using local Marker library, optionally only the pages in page_range.
+
+        With adaptive_ocr, force_ocr is ignored and each page is checked first:
+        pages with a usable text layer are converted without OCR and only raster
+        or garbled pages are OCRed. The per-page decisions and timings are
+        returned under "ocr_report".
+        """
         try:
-            from marker.converters.pdf import PdfConverter
-            from marker.output import text_from_rendered
+            registry = registry or self.registry
 
-            config = {
-                "output_format": output_format,
-                "force_ocr": force_ocr,
-                "langs": langs.split(",") if langs else ["en"],
-                "paginate_output": True,
-            }
-            
-            # Configure image extraction if directory is specified
+            # Images come back in the rendered output and are written by the caller,
+            # so the directory is only prepared here and not part of the converter config
             if extracted_image_dir:
-                config["save_images"] = True
-                config["image_dir"] = extracted_image_dir
                 os.makedirs(extracted_image_dir, exist_ok=True)
-                            
-            converter = PdfConverter(artifact_dict=self.artifact_dict, config=config)
-            rendered = converter(file_path)
 
-            if output_format.lower() == "markdown":
-                content, markdown, images = text_from_rendered(rendered)
-                return {
-                    "success": True,
-                    "content": content,
-                    "markdown": markdown,
-                    "images": images
-                }
-            else:
+            if output_format.lower() != "markdown":
                 return {
                     "success": False,
                     "error": f"Unsupported local output format: {output_format}. Only markdown is supported locally.",
                 }
 
+            if adaptive_ocr:
+                return self._parse_adaptive(registry, file_path, output_format, langs, page_range)
+
+            content, markdown, images = self._convert(
+                registry, file_path, output_format, force_ocr, langs, page_range
+            )
+            return {
+                "success": True,
+                "content": content,
+                "markdown": markdown,
+                "images": images
+            }
+
         except Exception as e:
             return {"success": False, "error": f"Error during local parsing: {str(e)}"}
-        
\ No newline at end of file
+
+    def iter_pages(
+        self,
+        file_path: str,
+        output_format: str = "markdown",
+        chunk_size: int = 4,
+        page_range: Optional[List[int]] = None,
+        ocr_reports: Optional[List[Dict[str, Any]]] = None,
+        **kwargs,
+    ):
+        """
+        Parse a PDF a few pages at a time and yield one result per page.
+
+        Only chunk_size pages of rendered output and images are held at once,
+        so memory stays flat however long the document is.
+
+        Args:
+            file_path: Path to the PDF file
+            output_format: Desired output format (default: "markdown")
+            chunk_size: Pages converted per Marker call
+            page_range: Only these pages (default: every page)
+            ocr_reports: List that receives each chunk's ocr_report with adaptive OCR
+            **kwargs: Passed on to parse_locally
+
+        Yields:
+            Dictionaries with "page", "content" (that page's markdown) and "images"
+        """
+        import pypdfium2 as pdfium
+
+        if page_range is None:
+            pdf = pdfium.PdfDocument(file_path)
+            page_range = list(range(len(pdf)))
+            pdf.close()
+        page_range = list(page_range)
+
+        for start in range(0, len(page_range), max(1, chunk_size)):
+            chunk = page_range[start:start + max(1, chunk_size)]
+            result = self.parse_locally(file_path, output_format, page_range=chunk, **kwargs)
+            if not result["success"]:
+                raise RuntimeError(result.get("error"))
+            if ocr_reports is not None and "ocr_report" in result:
+                ocr_reports.append(result["ocr_report"])
+
+            contents = split_pages(result["content"])
+            images = dict(result.get("images") or {})
+            for index, page in enumerate(chunk):
+                prefix = f"_page_{page}_"
+                page_images = {name: img for name, img in images.items() if name.startswith(prefix)}
+                for name in page_images:
+                    del images[name]
+                # Images Marker didn't name by page stay with the chunk's last page
+                if index == len(chunk) - 1:
+                    page_images.update(images)
+                yield {"page": page, "content": contents.get(page, ""), "images": page_images}
+
+    def _convert(self, registry: ModelRegistry, file_path: str, output_format: str,
+                 force_ocr: bool, langs: Optional[str], page_range: Optional[List[int]]):
+        from marker.output import text_from_rendered
+
+        converter = registry.get_converter(output_format, force_ocr, langs, page_range)
+        rendered = converter(file_path)
+        return text_from_rendered(rendered)
+
+    def _parse_adaptive(self, registry: ModelRegistry, file_path: str, output_format: str,
+                        langs: Optional[str], page_range: Optional[List[int]]) -> Dict[str, Any]:
+        start_time = time.time()
+        decisions = inspect_text_layer(file_path, page_range=page_range)
+        inspect_time = time.time() - start_time
+
+        pages: Dict[int, str] = {}
+        images: Dict[str, Any] = {}
+        markdown = "md"
+        timings = {"inspect": inspect_time, "text": 0.0, "ocr": 0.0}
+        for force_ocr, label in ((False, "text"), (True, "ocr")):
+            group = [d["page"] for d in decisions if d["ocr"] == force_ocr]
+            if not group:
+                continue
+            start_time = time.time()
+            content, markdown, group_images = self._convert(
+                registry, file_path, output_format, force_ocr, langs, group
+            )
+            timings[label] = time.time() - start_time
+            pages.update(split_pages(content))
+            images.update(group_images)
+
+        ocr_pages = sum(1 for d in decisions if d["ocr"])
+        text_pages = len(decisions) - ocr_pages
+        # Estimate of what OCRing the text-layer pages would have cost at this deck's OCR rate
+        per_page_ocr = timings["ocr"] / ocr_pages if ocr_pages else None
+        return {
+            "success": True,
+            "content": paginate(pages),
+            "markdown": markdown,
+            "images": images,
+            "ocr_report": {
+                "pages": decisions,
+                "ocr_pages": ocr_pages,
+                "text_pages": text_pages,
+                "timings": timings,
+                "estimated_ocr_time_saved": per_page_ocr * text_pages if per_page_ocr is not None else None,
+            },
+        }
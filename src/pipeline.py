@@ -0,0 +1,461 @@
+import atexit
+import functools
+import json
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from config.config import Config
+from src.libre_office_service import get_office_service
+from src.manifest import ALL_STAGES
+from src.libre_pptx_to_pdf import convert_pptx_to_pdf
+from src.parser import MarkerPdfParser, paginate, split_pages
+from src.pptx_extractor import PptxNativeExtractor
+from src.utils.generate_metadata import generate_metadata
+from src.utils.image_dedup import ImageGrouper
+from src.utils.image_export import ImageWriter
+from src.utils.instrumentation import get_metrics
+from src.utils.llm_cache import LLMCache
+from src.utils.multimodal_llm import MultimodalLLM
+
+
+@dataclass
+class DeckJob:
+    """State of one deck as it moves through the processing stages"""
+    pptx_path: Path
+    output_dir: Optional[Path] = None
+    image_dir: Optional[Path] = None
+    pdf_path: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    markdown_path: Optional[Path] = None
+    error: Optional[str] = None
+    stages: tuple = ALL_STAGES
+    content_hash: Optional[str] = None
+    native: Optional[Dict[str, Any]] = None
+    markdown: Optional[str] = None
+    on_progress: Optional[Callable[..., None]] = None
+
+    @property
+    def name(self) -> str:
+        return self.pptx_path.name
+
+    def progress(self, stage: str, event: str, **data):
+        """Report a progress event (e.g. a slide written) to the job's listener, if any"""
+        if self.on_progress is not None:
+            self.on_progress(stage, event, **data)
+
+
+def prepare_outputs(job: DeckJob, config: Config, output_root: Optional[Path] = None):
+    """
+    Create the deck's output directory structure and fill in its output paths.
+
+    Args:
+        job: Deck to prepare
+        config: Run configuration
+        output_root: Directory the deck's folder is created in (default: config.output_path)
+    """
+    job.output_dir = (output_root or config.output_path) / job.pptx_path.stem
+    job.output_dir.mkdir(parents=True, exist_ok=True)
+
+    job.image_dir = job.output_dir / "images"
+    job.image_dir.mkdir(parents=True, exist_ok=True)
+
+    job.markdown_path = job.output_dir / f"{job.pptx_path.stem}.md"
+
+
+def timed_stage(name: str):
+    """Record a stage function's duration (and profile) against the job's deck"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(job: DeckJob, *args, **kwargs):
+            with get_metrics().stage(name, job.name):
+                return func(job, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_office_profiles = threading.local()
+
+
+def _office_profile() -> str:
+    """
+    Private LibreOffice profile for the calling thread, created on first use.
+
+    Pool workers and pipeline threads each convert with their own profile, so
+    concurrent soffice runs never share (and corrupt) the default one.
+    """
+    profile_dir = getattr(_office_profiles, "path", None)
+    if profile_dir is None:
+        profile_dir = tempfile.mkdtemp(prefix="slidesage-office-")
+        atexit.register(shutil.rmtree, profile_dir, ignore_errors=True)
+        _office_profiles.path = profile_dir
+    return profile_dir
+
+
+@timed_stage("convert")
+def convert_stage(job: DeckJob, config: Config):
+    """
+    Convert the PPTX to PDF. With the pptx engine, slides are first read natively
+    and the PDF is only produced when some slides are image-heavy.
+    """
+    if config.engine == "pptx":
+        native = PptxNativeExtractor().extract(str(job.pptx_path))
+        if native["success"]:
+            job.native = native
+            if not native["ocr_pages"]:
+                return
+        else:
+            print(f"{native['error']}; falling back to Marker for {job.name}")
+
+    if config.office_instances > 0:
+        job.pdf_path = get_office_service(config.office_instances).convert(job.pptx_path)
+    else:
+        job.pdf_path = convert_pptx_to_pdf(str(job.pptx_path), user_profile=_office_profile())
+
+
+@timed_stage("parse")
+def parse_stage(job: DeckJob, config: Config, parser: MarkerPdfParser):
+    """Run Marker over the converted PDF, or only its image-heavy pages for native decks"""
+    if job.native is not None:
+        pages = dict(job.native["pages"])
+        images = dict(job.native["images"])
+        if job.native["ocr_pages"]:
+            result = parser.parse(
+                file_path=str(job.pdf_path),
+                output_format=config.output_format,
+                langs=config.langs,
+                extracted_image_dir=str(job.image_dir),
+                force_ocr=config.force_ocr,
+                adaptive_ocr=config.adaptive_ocr,
+                page_range=job.native["ocr_pages"],
+            )
+            if not result["success"]:
+                raise RuntimeError(result.get("error"))
+            pages.update(split_pages(result["content"]))
+            images.update(result.get("images") or {})
+        job.result = {"success": True, "content": paginate(pages), "images": images}
+        if job.native["ocr_pages"] and "ocr_report" in result:
+            job.result["ocr_report"] = result["ocr_report"]
+        job.native = None
+        return
+
+    if config.stream_pages:
+        # Pages are parsed and written a chunk at a time, so the write stage has nothing left to do
+        if not os.path.exists(job.pdf_path):
+            raise RuntimeError(f"File not found: {job.pdf_path}")
+        os.makedirs(job.image_dir, exist_ok=True)
+        ocr_reports: List[Dict[str, Any]] = []
+        pages = parser.iter_pages(
+            str(job.pdf_path),
+            output_format=config.output_format,
+            chunk_size=config.stream_chunk_pages,
+            ocr_reports=ocr_reports,
+            langs=config.langs,
+            force_ocr=config.force_ocr,
+            adaptive_ocr=config.adaptive_ocr,
+        )
+        write_page_stream(job, pages, config)
+        job.result = {"success": True, "streamed": True}
+        if ocr_reports:
+            job.result["ocr_report"] = merge_ocr_reports(ocr_reports)
+        return
+
+    job.result = parser.parse(
+        file_path=str(job.pdf_path),
+        output_format=config.output_format,
+        langs=config.langs,
+        extracted_image_dir=str(job.image_dir),
+        force_ocr=config.force_ocr,
+        adaptive_ocr=config.adaptive_ocr,
+    )
+    if not job.result["success"]:
+        raise RuntimeError(job.result.get("error"))
+
+
+_IMAGE_LINK = re.compile(r'!\[([^\]]*)\]\(([^)\s]+)\)')
+
+
+def rewrite_image_links(content: str, stored_names: Dict[str, str]) -> str:
+    """Point links to extracted images at their stored files in images/, in a single pass"""
+    return _IMAGE_LINK.sub(
+        lambda m: f"![{m.group(1)}](images/{stored_names[m.group(2)]})"
+        if m.group(2) in stored_names else m.group(0),
+        content
+    )
+
+
+def write_page_stream(job: DeckJob, pages, config: Config):
+    """Write per-page parse results as they arrive, holding one page in memory at a time"""
+    with ImageWriter(job.image_dir, config.image_writers) as writer, \
+            open(job.markdown_path, "w", encoding="utf-8") as f:
+        for page in pages:
+            stored_names = writer.add_all(page["images"])
+            f.write(paginate({page["page"]: rewrite_image_links(page["content"], stored_names)}))
+            job.progress("write", "slide", slide=page["page"])
+    writer.prune()
+
+
+def merge_ocr_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine the ocr_report of each streamed chunk into one for the deck"""
+    saved = [r["estimated_ocr_time_saved"] for r in reports if r["estimated_ocr_time_saved"] is not None]
+    return {
+        "pages": [page for r in reports for page in r["pages"]],
+        "ocr_pages": sum(r["ocr_pages"] for r in reports),
+        "text_pages": sum(r["text_pages"] for r in reports),
+        "timings": {
+            name: sum(r["timings"][name] for r in reports) for name in ("inspect", "text", "ocr")
+        },
+        "estimated_ocr_time_saved": sum(saved) if saved else None,
+    }
+
+
+@timed_stage("write")
+def write_stage(job: DeckJob, config: Config):
+    """Save extracted images and the markdown with image links rewritten"""
+    if not job.result.get("streamed"):
+        # Images are written in the background while the markdown is saved
+        with ImageWriter(job.image_dir, config.image_writers) as writer:
+            stored_names = writer.add_all(job.result.get("images") or {})
+            job.markdown = rewrite_image_links(job.result["content"], stored_names)
+            with open(job.markdown_path, "w", encoding="utf-8") as f:
+                f.write(job.markdown)
+        writer.prune()
+        if job.on_progress is not None:
+            pages = sorted(split_pages(job.result["content"]))
+            for page in pages:
+                job.progress("write", "slide", slide=page, total=len(pages))
+
+    # Keep the per-page OCR decisions next to the markdown
+    report = job.result.get("ocr_report")
+    if report is not None:
+        with open(job.output_dir / f"{job.pptx_path.stem}_ocr.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        saved = report["estimated_ocr_time_saved"]
+        print(f"OCR for {job.name}: {report['ocr_pages']} pages OCRed, "
+              f"{report['text_pages']} used the text layer"
+              + (f" (~{saved:.2f}s OCR saved)" if saved else ""))
+
+    # Release the rendered images before the deck waits on the LLM stage
+    job.result = None
+
+
+def create_llm(config: Config) -> MultimodalLLM:
+    """Build the Ollama client for a run, backed by the on-disk LLM cache when enabled"""
+    cache = None
+    if config.llm_cache:
+        cache = LLMCache(
+            str(config.cache_path / "llm_cache.sqlite"),
+            max_bytes=config.llm_cache_size_mb * 1024 * 1024
+        )
+    return MultimodalLLM(
+        model_name=config.model_name,
+        base_url=config.ollama_url,
+        max_concurrency=config.llm_concurrency,
+        cache=cache,
+        max_image_side=config.max_image_side or None,
+        images_per_request=config.images_per_request,
+        timeout=config.llm_timeout,
+        max_retries=config.llm_retries
+    )
+
+
+_run_grouper: Optional[ImageGrouper] = None
+_run_grouper_lock = threading.Lock()
+
+
+def get_image_grouper(config: Config) -> Optional[ImageGrouper]:
+    """
+    Return the near-duplicate grouper for one deck: a fresh one per deck, or one
+    shared by every deck in this process when dedup_scope is "run"
+    """
+    global _run_grouper
+    if not config.dedup_images:
+        return None
+    if config.dedup_scope != "run":
+        return ImageGrouper(threshold=config.dedup_threshold)
+    with _run_grouper_lock:
+        if _run_grouper is None:
+            _run_grouper = ImageGrouper(threshold=config.dedup_threshold)
+    return _run_grouper
+
+
+@timed_stage("enrich")
+def enrich_stage(job: DeckJob, config: Config, multimodal_llm: Optional[MultimodalLLM] = None):
+    """Generate metadata with slide summaries and image descriptions"""
+    if multimodal_llm is None:
+        multimodal_llm = create_llm(config)
+    generate_metadata(
+        str(job.markdown_path),
+        multimodal_llm,
+        get_image_grouper(config),
+        summary_batch_size=config.summary_batch_size,
+        summary_token_budget=config.summary_token_budget,
+        progress=lambda event, slide, total: job.progress("enrich", event, slide=slide, total=total),
+        markdown_content=job.markdown,
+        metadata_format=config.metadata_format,
+        deck_name=job.name,
+    )
+    job.markdown = None
+
+
+@dataclass
+class StageStats:
+    """Throughput counters for one pipeline stage"""
+    name: str
+    processed: int = 0
+    failed: int = 0
+    busy_time: float = 0.0
+    first_start: Optional[float] = None
+    last_end: Optional[float] = None
+
+    def record(self, start: float, end: float, success: bool):
+        if self.first_start is None:
+            self.first_start = start
+        self.last_end = end
+        self.busy_time += end - start
+        if success:
+            self.processed += 1
+        else:
+            self.failed += 1
+
+    def summary(self) -> str:
+        wall_time = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+        throughput = self.processed / wall_time if wall_time > 0 else 0.0
+        return (f"{self.name:<8} decks: {self.processed} (failed: {self.failed}), "
+                f"busy: {self.busy_time:.2f}s, throughput: {throughput:.2f} decks/s")
+
+
+# Marks the end of the input on a stage queue
+_DONE = object()
+
+
+class StagedPipeline:
+    """
+    Run convert -> parse -> write -> enrich as concurrent stages joined by bounded queues.
+
+    While one deck is being parsed the next one is converted and the previous one
+    is enriched by the LLM. Each queue holds at most ``config.queue_depth`` decks,
+    so a slow stage applies backpressure to the stages feeding it.
+    """
+
+    def __init__(self, config: Config, parser: Optional[MarkerPdfParser] = None,
+                 multimodal_llm: Optional[MultimodalLLM] = None,
+                 on_success: Optional[Callable[[DeckJob], None]] = None):
+        """
+        Args:
+            config: Run configuration
+            parser: Warm parser to use (default: one on the process-wide model registry)
+            multimodal_llm: LLM client for enrichment (default: built on first use)
+            on_success: Called with each deck that completes every stage
+        """
+        self.config = config
+        self.parser = parser or MarkerPdfParser()
+        self.multimodal_llm = multimodal_llm
+        self.on_success = on_success
+
+        self.stages: List[tuple] = [
+            ("convert", lambda job: convert_stage(job, config)),
+            ("parse", lambda job: parse_stage(job, config, self.parser)),
+            ("write", lambda job: write_stage(job, config)),
+        ]
+        if config.desc_images:
+            self.stages.append(("enrich", self._enrich))
+        self.stats = {name: StageStats(name) for name, _ in self.stages}
+
+        self._lock = threading.Lock()
+        self.processed_count = 0
+        self.error_count = 0
+
+    def _enrich(self, job: DeckJob):
+        if self.multimodal_llm is None:
+            self.multimodal_llm = create_llm(self.config)
+        enrich_stage(job, self.config, self.multimodal_llm)
+
+    def _finish(self, job: DeckJob):
+        with self._lock:
+            if job.error is None:
+                self.processed_count += 1
+            else:
+                self.error_count += 1
+                print(f"Error processing {job.name}: {job.error}")
+        if job.error is None and self.on_success is not None:
+            self.on_success(job)
+
+    def _run_stage(self, name: str, func: Callable[[DeckJob], None],
+                   inbox: queue.Queue, outbox: Optional[queue.Queue]):
+        stats = self.stats[name]
+        while True:
+            job = inbox.get()
+            if job is _DONE:
+                if outbox is not None:
+                    outbox.put(_DONE)
+                break
+
+            # Failed decks skip the remaining stages but still flow through in order,
+            # as do decks whose plan leaves this stage out
+            if job.error is None and name in job.stages:
+                start = time.time()
+                try:
+                    func(job)
+                except Exception as e:
+                    job.error = f"{name} stage failed: {str(e)}"
+                stats.record(start, time.time(), job.error is None)
+
+            if outbox is not None:
+                outbox.put(job)
+            else:
+                self._finish(job)
+
+    def run(self, jobs) -> tuple:
+        """
+        Push every deck through the pipeline and wait for all stages to drain.
+
+        Args:
+            jobs: Iterable of DeckJobs or PPTX paths to process
+
+        Returns:
+            Tuple of (processed count, error count)
+        """
+        depth = max(1, self.config.queue_depth)
+        queues = [queue.Queue(maxsize=depth) for _ in self.stages]
+
+        threads = []
+        for index, (name, func) in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            thread = threading.Thread(
+                target=self._run_stage,
+                args=(name, func, queues[index], outbox),
+                name=f"slidesage-{name}",
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+
+        # Blocks once the convert queue is full
+        for job in jobs:
+            if not isinstance(job, DeckJob):
+                job = DeckJob(pptx_path=Path(job))
+            try:
+                prepare_outputs(job, self.config)
+            except OSError as e:
+                job.error = f"could not create output directory: {str(e)}"
+            queues[0].put(job)
+        queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        return self.processed_count, self.error_count
+
+    def report(self):
+        """Print per-stage throughput"""
+        print("\nStage throughput:")
+        for name, _ in self.stages:
+            print(f"  {self.stats[name].summary()}")
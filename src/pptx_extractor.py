@@ -0,0 +1,178 @@
+from typing import Any, Dict, List, Optional
+
+# Picture formats the PDF path renders but the vision model can't read
+VECTOR_IMAGE_EXTS = ("emf", "wmf")
+
+
+def _escape_cell(text: str) -> str:
+    return text.replace("|", "\\|").replace("\n", " ").strip()
+
+
+def _table_markdown(table) -> str:
+    rows = [[_escape_cell(cell.text) for cell in row.cells] for row in table.rows]
+    if not rows:
+        return ""
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    lines = ["| " + " | ".join(rows[0]) + " |", "|" + "---|" * width]
+    lines.extend("| " + " | ".join(row) + " |" for row in rows[1:])
+    return "\n".join(lines)
+
+
+class PptxNativeExtractor:
+    """
+    Extract slide text, tables, notes and pictures straight from the PPTX XML.
+
+    Text-native slides never touch LibreOffice or OCR. Slides dominated by
+    pictures, charts or diagrams are reported so only those pages go through
+    the PDF conversion and Marker path. Hidden slides are skipped, as they are
+    left out of the PDF export, so page indices match the converted PDF.
+    """
+
+    def __init__(self, image_area_threshold: float = 0.5, min_text_chars: int = 40):
+        """
+        Args:
+            image_area_threshold: Fraction of the slide covered by pictures above which
+                                  a slide with little text is sent to OCR
+            min_text_chars: Slides with less extractable text than this count as image-heavy
+        """
+        self.image_area_threshold = image_area_threshold
+        self.min_text_chars = min_text_chars
+
+    def extract(self, pptx_path: str) -> Dict[str, Any]:
+        """
+        Extract every slide of a presentation.
+
+        Args:
+            pptx_path: Path to the PPTX file
+
+        Returns:
+            Dictionary with "success", "pages" ({page index: markdown}), "images"
+            ({file name: original image bytes}), "ocr_pages" (page indices of
+            image-heavy slides to parse from the PDF instead) and "slide_count"
+            (visible slides, i.e. PDF pages). Page indices count visible slides only.
+        """
+        try:
+            from pptx import Presentation
+        except ImportError as e:
+            return {"success": False, "error": f"Required module not found: {str(e)}. Install with: pip install python-pptx"}
+
+        try:
+            presentation = Presentation(pptx_path)
+            slide_area = (presentation.slide_width or 1) * (presentation.slide_height or 1)
+
+            pages: Dict[int, str] = {}
+            images: Dict[str, bytes] = {}
+            ocr_pages: List[int] = []
+            visible = [slide for slide in presentation.slides if not self._is_hidden(slide)]
+            for index, slide in enumerate(visible):
+                page = self._extract_slide(slide, index, slide_area)
+                if page["image_heavy"]:
+                    ocr_pages.append(index)
+                    continue
+                pages[index] = page["markdown"]
+                images.update(page["images"])
+
+            return {
+                "success": True,
+                "pages": pages,
+                "images": images,
+                "ocr_pages": ocr_pages,
+                "slide_count": len(visible),
+            }
+        except Exception as e:
+            return {"success": False, "error": f"Error during native PPTX extraction: {str(e)}"}
+
+    def _extract_slide(self, slide, index: int, slide_area: int) -> Dict[str, Any]:
+        from pptx.shapes.picture import Picture
+
+        blocks: List[str] = []
+        images: Dict[str, bytes] = {}
+        state = {"text_chars": 0, "picture_area": 0, "visual": False, "shape_id": 0}
+
+        title_shape = slide.shapes.title
+        for shape in self._iter_shapes(slide.shapes):
+            state["shape_id"] += 1
+            if getattr(shape, "has_chart", False) or self._is_diagram(shape):
+                state["visual"] = True
+                continue
+
+            if getattr(shape, "has_table", False):
+                table = _table_markdown(shape.table)
+                if table:
+                    blocks.append(table)
+                    state["text_chars"] += len(table)
+                continue
+
+            if isinstance(shape, Picture):
+                image = self._shape_image(shape)
+                if image is None or image.ext in VECTOR_IMAGE_EXTS:
+                    # EMF/WMF or otherwise unreadable: leave the picture to the PDF rendering
+                    if image is not None or shape._element.blip_rId:
+                        state["visual"] = True
+                    continue
+                name = f"_page_{index}_Picture_{state['shape_id']}.{image.ext}"
+                images[name] = image.blob
+                blocks.append(f"![]({name})")
+                state["picture_area"] += (shape.width or 0) * (shape.height or 0)
+                continue
+
+            if getattr(shape, "has_text_frame", False) and shape.text_frame.text.strip():
+                if title_shape is not None and shape.shape_id == title_shape.shape_id:
+                    blocks.append(f"# {shape.text_frame.text.strip()}")
+                else:
+                    blocks.extend(self._paragraphs(shape.text_frame))
+                state["text_chars"] += len(shape.text_frame.text.strip())
+
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame.text.strip() if slide.notes_slide.notes_text_frame else ""
+            if notes:
+                blocks.append("\n".join(f"> {line}" for line in notes.splitlines() if line.strip()))
+
+        image_heavy = state["visual"] or (
+            state["picture_area"] / slide_area >= self.image_area_threshold
+            and state["text_chars"] < self.min_text_chars
+        )
+        return {"markdown": "\n\n".join(blocks), "images": images, "image_heavy": image_heavy}
+
+    def _iter_shapes(self, shapes):
+        """Yield shapes in reading order, descending into groups"""
+        from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+        ordered = sorted(shapes, key=lambda s: ((s.top or 0), (s.left or 0)))
+        for shape in ordered:
+            if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+                yield from self._iter_shapes(shape.shapes)
+            else:
+                yield shape
+
+    @staticmethod
+    def _is_hidden(slide) -> bool:
+        return slide._element.get("show") in ("0", "false")
+
+    @staticmethod
+    def _is_diagram(shape) -> bool:
+        """SmartArt and other graphic frames without a table or chart, placeholders included"""
+        from pptx.shapes.graphfrm import GraphicFrame
+
+        return isinstance(shape, GraphicFrame) and not getattr(shape, "has_table", False)
+
+    @staticmethod
+    def _shape_image(shape) -> Optional[Any]:
+        """The picture's image, or None if it is empty or in a format python-pptx can't read"""
+        try:
+            image = shape.image
+            image.ext
+            return image
+        except (AttributeError, ValueError):
+            return None
+
+    @staticmethod
+    def _paragraphs(text_frame) -> List[str]:
+        lines = []
+        for paragraph in text_frame.paragraphs:
+            text = "".join(run.text for run in paragraph.runs).strip()
+            if not text:
+                continue
+            lines.append(f"{'  ' * paragraph.level}- {text}" if paragraph.level else text)
+        return ["\n".join(lines)] if lines else []
@@ -0,0 +1,237 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.llm_cache import hash_file
+
+# Embedding model of a new index when none is given
+DEFAULT_EMBEDDING_MODEL = "nomic-embed-text"
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError(f"Required module not found: {str(e)}. Install with: pip install numpy")
+    return np
+
+
+def slide_documents(metadata_path: Path) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """
+    Yield the searchable text of every slide in a metadata JSON or JSONL file.
+
+    The text of a slide is its summary, its content and the descriptions of its images.
+
+    Yields:
+        Tuples of (record identifying the slide, text to embed)
+    """
+    with open(metadata_path, "r", encoding="utf-8") as f:
+        if Path(metadata_path).suffix == ".jsonl":
+            # Header line, one slide per line, then a trailer line with the totals
+            metadata = json.loads(f.readline() or "{}")
+            slides = [slide for slide in (json.loads(line) for line in f if line.strip())
+                      if "slide_number" in slide]
+        else:
+            metadata = json.load(f)
+            slides = metadata.get("slides", [])
+    for slide in slides:
+        parts = [slide.get("desc_summary") or "", slide.get("description") or ""]
+        parts.extend(img.get("description") or "" for img in slide.get("images", []))
+        text = "\n".join(part.strip() for part in parts if part and part.strip())
+        if not text:
+            continue
+        record = {
+            "deck": metadata.get("source_file"),
+            "slide": slide.get("slide_number"),
+            "summary": slide.get("desc_summary") or "",
+        }
+        yield record, text
+
+
+class VectorIndex:
+    """
+    Slide embeddings in a memory-mapped float32 matrix, searched by cosine similarity.
+
+    The directory holds ``vectors.f32`` (unit-length rows, appended in place),
+    ``ids.jsonl`` (one record per row) and ``index.json`` (dimension, model,
+    row count and the content hash of every indexed metadata file). Only new or
+    changed metadata files are embedded; rows from an older version of a file are
+    masked out of results and dropped when the index is compacted.
+    """
+
+    def __init__(self, directory: Path):
+        """
+        Args:
+            directory: Directory holding the index files (created on first update)
+        """
+        self.directory = Path(directory)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.ids_path = self.directory / "ids.jsonl"
+        self.meta_path = self.directory / "index.json"
+        self.meta: Dict[str, Any] = {"dim": None, "model": None, "count": 0, "ids_bytes": 0, "sources": {}}
+        if self.meta_path.exists():
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.meta.update(json.load(f))
+        self._matrix = None
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self._live = None
+
+    @property
+    def count(self) -> int:
+        return self.meta["count"]
+
+    def _save_meta(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+        self._matrix = self._records = self._live = None
+
+    def _load(self):
+        """Map the vectors and read the id table, once per change of the index"""
+        if self._matrix is not None:
+            return
+        np = _numpy()
+        count, dim = self.meta["count"], self.meta["dim"] or 0
+        if count:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, dim))
+        else:
+            self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._records = []
+        if count:
+            with open(self.ids_path, "rb") as f:
+                self._records = [json.loads(line) for line in f.read(self.meta["ids_bytes"]).splitlines()]
+        sources = self.meta["sources"]
+        self._live = np.array([sources.get(r["source"]) == r["source_hash"] for r in self._records], dtype=bool)
+
+    def _append(self, vectors, records: List[Dict[str, Any]]):
+        np = _numpy()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Drop anything past the recorded end, left by an interrupted append
+        for path, size in ((self.vectors_path, self.meta["count"] * (self.meta["dim"] or 0) * 4),
+                           (self.ids_path, self.meta["ids_bytes"])):
+            if path.exists() and path.stat().st_size > size:
+                os.truncate(path, size)
+
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self.ids_path, "ab") as f:
+            f.write(lines)
+        self.meta["count"] += len(records)
+        self.meta["ids_bytes"] += len(lines)
+
+    def update(self, metadata_paths: List[Path], multimodal_llm, model: Optional[str] = None,
+               prune: bool = True) -> Dict[str, int]:
+        """
+        Embed the slides of new or changed metadata files and append them.
+
+        Args:
+            metadata_paths: Metadata JSON files to make searchable
+            multimodal_llm: MultimodalLLM used to call the embeddings endpoint
+            model: Embedding model name (default: the index's model, or
+                   DEFAULT_EMBEDDING_MODEL for a new index)
+            prune: Treat metadata_paths as the complete set and remove files
+                   indexed before but missing from it
+
+        Returns:
+            Counts of "decks" embedded, "slides" added and "removed" decks
+        """
+        model = model or self.meta["model"] or DEFAULT_EMBEDDING_MODEL
+        if self.meta["model"] not in (None, model):
+            raise ValueError(f"Index was built with {self.meta['model']}; "
+                             f"rebuild it to switch to {model}")
+        sources = self.meta["sources"]
+        wanted = {str(Path(path)) for path in metadata_paths}
+        removed = [source for source in sources if source not in wanted] if prune else []
+        for source in removed:
+            del sources[source]
+
+        stats = {"decks": 0, "slides": 0, "removed": len(removed)}
+        for path in sorted(wanted):
+            content_hash = hash_file(path)
+            if sources.get(path) == content_hash:
+                continue
+            documents = list(slide_documents(Path(path)))
+            vectors = multimodal_llm.map_concurrent(
+                lambda document: multimodal_llm.embed(document[1], model), documents
+            )
+            if documents:
+                dim = len(vectors[0])
+                if self.meta["dim"] not in (None, dim):
+                    raise ValueError(f"Embedding size changed from {self.meta['dim']} to {dim}; rebuild the index")
+                self.meta["dim"], self.meta["model"] = dim, model
+                self._append(vectors, [
+                    {"source": path, "source_hash": content_hash, **record} for record, _ in documents
+                ])
+            # The file's hash is recorded last, so an interrupted deck is embedded again
+            sources[path] = content_hash
+            self._save_meta()
+            stats["decks"] += 1
+            stats["slides"] += len(documents)
+
+        self._save_meta()
+        self._load()
+        if self.count and int(self._live.sum()) * 2 < self.count:
+            self.compact()
+        return stats
+
+    def compact(self):
+        """Rewrite the index without rows from outdated or removed metadata files"""
+        self._load()
+        np = _numpy()
+        keep = np.flatnonzero(self._live)
+        vectors = np.array(self._matrix[keep])
+        records = [self._records[i] for i in keep]
+        self._matrix = None
+        for path in (self.vectors_path, self.ids_path):
+            if path.exists():
+                path.unlink()
+        self.meta["count"] = self.meta["ids_bytes"] = 0
+        if records:
+            self._append(vectors, records)
+        self._save_meta()
+
+    def search(self, query_vector, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Return the k slides most similar to a query embedding.
+
+        Args:
+            query_vector: Embedding of the query
+            k: Number of results
+
+        Returns:
+            Slide records with a "score" (cosine similarity), best first
+        """
+        self._load()
+        np = _numpy()
+        live = int(self._live.sum())
+        if not live or k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+        scores = np.where(self._live, self._matrix @ query, -np.inf)
+        k = min(k, live)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{"score": float(scores[i]), **self._records[i]} for i in top]
+
+    def query(self, text: str, multimodal_llm, model: Optional[str] = None, k: int = 10) -> List[Dict[str, Any]]:
+        """Embed a text query with the index's model and search for it"""
+        if model and self.meta["model"] not in (None, model):
+            # Vectors from another model have another size or meaning, so scores would be noise
+            raise ValueError(f"Index was built with {self.meta['model']}; query it with that model "
+                             f"or rebuild it with {model}")
+        return self.search(multimodal_llm.embed(text, model or self.meta["model"]), k)
+
+
+def find_metadata_files(output_dir: Path) -> List[Path]:
+    """Every metadata JSON or JSONL file written under an output directory"""
+    output_dir = Path(output_dir)
+    return sorted([*output_dir.rglob("*_metadata.json"), *output_dir.rglob("*_metadata.jsonl")])
@@ -0,0 +1,331 @@
+import itertools
+import json
+import queue
+import re
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from config.config import Config
+from src.parser import MarkerPdfParser
+from src.pipeline import (DeckJob, prepare_outputs, convert_stage, parse_stage, write_stage,
+                          enrich_stage, create_llm)
+from src.utils.generate_metadata import metadata_path_for
+from src.utils.instrumentation import get_metrics
+from src.utils.multimodal_llm import MultimodalLLM
+
+
+@dataclass
+class IngestJob:
+    """A deck submitted to the service, with its status and progress events"""
+    job_id: str
+    name: str
+    priority: int
+    deck: DeckJob
+    status: str = "queued"
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self, since: int = 0) -> Dict[str, Any]:
+        return {
+            "id": self.job_id,
+            "name": self.name,
+            "priority": self.priority,
+            "status": self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "events": self.events[since:],
+        }
+
+
+class IngestService:
+    """
+    Long-running deck processor with warm models and a priority job queue.
+
+    The Marker models and the Ollama client are created once and shared by every
+    job. Jobs are taken in priority order (lower first, then submission order)
+    by ``config.server_workers`` threads, and each stage has its own concurrency
+    limit so, for example, only one deck is parsed at a time while others are
+    converted or enriched. A job's upload is deleted once it finishes, and the
+    job and its outputs are dropped ``config.server_job_retention_hours`` later.
+
+    Per-deck metrics are turned off: jobs overlap, so a per-deck peak RSS would
+    be meaningless, and the table would grow with every job. Stage histograms
+    are still recorded, and each job's timings are in its progress events.
+    """
+
+    def __init__(self, config: Config, parser: Optional[MarkerPdfParser] = None,
+                 multimodal_llm: Optional[MultimodalLLM] = None):
+        """
+        Args:
+            config: Service configuration
+            parser: Warm parser to use (default: one on the process-wide model registry)
+            multimodal_llm: LLM client for enrichment (default: built from config)
+        """
+        self.config = config
+        get_metrics().track_decks = False
+        self.parser = parser or MarkerPdfParser()
+        self.multimodal_llm = multimodal_llm
+        if self.multimodal_llm is None and config.desc_images:
+            self.multimodal_llm = create_llm(config)
+
+        self.upload_dir = config.cache_path / "uploads"
+        self.output_root = config.output_path / "jobs"
+
+        workers = max(1, config.server_workers)
+        self._limits = {
+            "convert": threading.Semaphore(max(1, config.office_instances)),
+            "parse": threading.Semaphore(1),
+            "write": threading.Semaphore(workers),
+            "enrich": threading.Semaphore(workers),
+        }
+        self._stages = [
+            ("convert", lambda job: convert_stage(job, config)),
+            ("parse", lambda job: parse_stage(job, config, self.parser)),
+            ("write", lambda job: write_stage(job, config)),
+        ]
+        if config.desc_images:
+            self._stages.append(("enrich", lambda job: enrich_stage(job, config, self.multimodal_llm)))
+
+        self.jobs: Dict[str, IngestJob] = {}
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Start the job workers and load the models in the background"""
+        threading.Thread(target=self._warm_up, name="slidesage-warmup", daemon=True).start()
+        for index in range(max(1, self.config.server_workers)):
+            thread = threading.Thread(target=self._work, name=f"slidesage-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Let the workers finish their current job and exit"""
+        for _ in self._threads:
+            self._queue.put((float("inf"), next(self._sequence), None))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _warm_up(self):
+        try:
+            self.parser.artifact_dict
+            print(f"Models loaded in {self.parser.registry.load_time:.2f} seconds")
+        except Exception as e:
+            # Left to surface per job from the parse stage
+            print(f"Failed to load models: {str(e)}")
+
+    def submit(self, name: str, data: bytes, priority: int = 0) -> IngestJob:
+        """
+        Queue a deck for processing.
+
+        Args:
+            name: File name of the deck (must end in .pptx)
+            data: Contents of the PPTX file
+            priority: Lower values are processed first
+
+        Returns:
+            The queued job
+        """
+        name = Path(name).name
+        if not name.lower().endswith(".pptx"):
+            raise ValueError(f"Expected a .pptx file, got: {name}")
+
+        job_id = uuid.uuid4().hex[:12]
+        pptx_path = self.upload_dir / job_id / name
+        pptx_path.parent.mkdir(parents=True, exist_ok=True)
+        pptx_path.write_bytes(data)
+
+        job = IngestJob(job_id=job_id, name=name, priority=priority, deck=DeckJob(pptx_path=pptx_path))
+        job.deck.on_progress = lambda stage, event, **data: self._event(job, stage, event, **data)
+        self._prune()
+        with self._lock:
+            self.jobs[job_id] = job
+        self._queue.put((priority, next(self._sequence), job_id))
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _event(self, job: IngestJob, stage: str, event: str, **data):
+        with self._lock:
+            job.events.append({"seq": len(job.events), "time": time.time(),
+                               "stage": stage, "event": event, **data})
+
+    def _work(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            if job_id is None:
+                break
+            job = self.get(job_id)
+            try:
+                self._process(job)
+            except Exception as e:
+                job.error = str(e)
+            job.status = "failed" if job.error else "done"
+            job.finished_at = time.time()
+            self._event(job, "job", job.status)
+            self._release(job)
+            self._prune()
+
+    def _release(self, job: IngestJob):
+        """Free what a finished job no longer needs: the upload, its PDF and in-memory results"""
+        shutil.rmtree(self.upload_dir / job.job_id, ignore_errors=True)
+        job.deck.result = job.deck.native = job.deck.markdown = None
+
+    def _prune(self):
+        """Forget jobs that finished more than the retention period ago and delete their outputs"""
+        retention = self.config.server_job_retention_hours * 3600
+        if retention <= 0:
+            return
+        cutoff = time.time() - retention
+        with self._lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+        for job_id in expired:
+            shutil.rmtree(self.output_root / job_id, ignore_errors=True)
+
+    def _process(self, job: IngestJob):
+        job.status = "running"
+        job.started_at = time.time()
+        deck = job.deck
+        prepare_outputs(deck, self.config, self.output_root / job.job_id)
+
+        for name, func in self._stages:
+            with self._limits[name]:
+                self._event(job, name, "started")
+                try:
+                    func(deck)
+                except Exception as e:
+                    job.error = f"{name} stage failed: {str(e)}"
+                    return
+            self._event(job, name, "finished")
+
+    def output_file(self, job: IngestJob, kind: str) -> Optional[Path]:
+        """Path of a finished job's "markdown" or "metadata" output, if it exists"""
+        if job.status != "done":
+            return None
+        if kind == "markdown":
+            path = job.deck.markdown_path
+        else:
+            path = Path(metadata_path_for(str(job.deck.markdown_path), self.config.metadata_format))
+        return path if path.exists() else None
+
+
+_JOB_PATH = re.compile(r"^/jobs/([0-9a-f]+)(?:/(markdown|metadata))?$")
+
+
+def _make_handler(service: IngestService, max_upload_bytes: int):
+    class IngestHandler(BaseHTTPRequestHandler):
+        """
+        POST /jobs?name=deck.pptx&priority=0   (body: the PPTX file) -> 202 with the job
+        GET  /jobs                             -> every job's status
+        GET  /jobs/<id>?since=N                -> status and progress events from N on
+        GET  /jobs/<id>/markdown | /metadata   -> the deck's outputs once written
+        GET  /health
+        """
+
+        def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status: int, payload: Any):
+            self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/jobs":
+                return self._json(404, {"error": "not found"})
+            query = parse_qs(url.query)
+            length = int(self.headers.get("Content-Length", 0))
+            if length <= 0:
+                return self._json(400, {"error": "empty upload"})
+            if length > max_upload_bytes:
+                return self._json(413, {"error": "upload too large"})
+            try:
+                priority = int(query.get("priority", ["0"])[0])
+                job = service.submit(query.get("name", ["deck.pptx"])[0], self.rfile.read(length), priority)
+            except ValueError as e:
+                return self._json(400, {"error": str(e)})
+            self._json(202, job.to_dict())
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                llm = service.multimodal_llm
+                return self._json(200, {
+                    "status": "ok",
+                    "models_loaded": service.parser.registry.loaded,
+                    "ollama": llm.endpoints.snapshot() if llm is not None else [],
+                })
+            if url.path == "/jobs":
+                with service._lock:
+                    jobs = list(service.jobs.values())
+                return self._json(200, [{k: v for k, v in job.to_dict().items() if k != "events"} for job in jobs])
+
+            match = _JOB_PATH.match(url.path)
+            job = service.get(match.group(1)) if match else None
+            if job is None:
+                return self._json(404, {"error": "job not found"})
+            if match.group(2) is None:
+                try:
+                    since = int(parse_qs(url.query).get("since", ["0"])[0] or 0)
+                except ValueError:
+                    return self._json(400, {"error": "since must be an integer"})
+                if since < 0:
+                    return self._json(400, {"error": "since must not be negative"})
+                return self._json(200, job.to_dict(since))
+
+            path = service.output_file(job, match.group(2))
+            if path is None:
+                return self._json(409, {"error": f"{match.group(2)} not available", "status": job.status})
+            if match.group(2) == "markdown":
+                content_type = "text/markdown; charset=utf-8"
+            elif path.suffix == ".jsonl":
+                content_type = "application/x-ndjson"
+            else:
+                content_type = "application/json"
+            self._send(200, path.read_bytes(), content_type)
+
+        def log_message(self, format, *args):
+            pass
+
+    return IngestHandler
+
+
+def serve(config: Config):
+    """Run the ingestion service until interrupted"""
+    service = IngestService(config)
+    service.start()
+    handler = _make_handler(service, config.server_max_upload_mb * 1024 * 1024)
+    server = ThreadingHTTPServer((config.server_host, config.server_port), handler)
+    print(f"SlideSage listening on http://{config.server_host}:{config.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        get_metrics().write_report(config.output_path / "run_report.json")
+        if config.prometheus:
+            get_metrics().write_prometheus(config.output_path / "run_report.prom")
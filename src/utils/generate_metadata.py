@@ -2,44 +2,83 @@ import json
 import os
 from datetime import datetime
 import re
-from typing import List, Dict, Any
+import itertools
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
-def extract_slide_content(markdown_content: str) -> List[Dict[str, Any]]:
-    # Split content by page separators
-    slides = re.split(r'\n\n{\d+}------------------------------------------------\n\n', markdown_content)
-    slides = [slide.strip() for slide in slides if slide.strip()]
+from src.utils.instrumentation import get_metrics
+from src.utils.llm_cache import EnrichmentJournal, LLMCache, hash_file
+from src.utils.multimodal_llm import BATCH_DESCRIBE_PROMPT, parse_json_array
+
+# Prompt used for slide summaries in generate_summary
+SUMMARY_PROMPT = "Summarize in exactly one sentence without any preamble or additional text: {text}"
+
+# Prompt used for several slides at once in generate_batch_summaries
+BATCH_SUMMARY_PROMPT = (
+    "Summarize each of the following {count} slides in exactly one sentence without any preamble. "
+    "Respond with only a JSON array of {count} strings, one summary per slide, in the same order.\n\n"
+    "{slides}"
+)
+
+# A line of Marker's page separator, and the path in an image line
+_SEPARATOR_LINE = re.compile(r'^\{\d+\}-{48}$')
+_IMAGE_PATH = re.compile(r'\((.*?)\)')
+
+# Slides enriched and written together in the JSONL output mode
+JSONL_WINDOW_SLIDES = 16
+
+def iter_slide_content(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Split paginated markdown into slides in a single pass over its lines.
     
-    slide_data = []
-    for i, slide in enumerate(slides):
-        # Extract all text content and images
-        lines = slide.split('\n')
-        description_lines = []
-        images = []
-        
-        for line in lines:
-            # Check for image references
-            if line.startswith('![') or line.startswith('![](images/'):
-                image_path = re.search(r'\((.*?)\)', line).group(1)
-                images.append({
-                    "path": image_path,
-                    "description": ""  # Will be filled by LLM later
-                })
-            # Collect all non-image lines as description, preserving markdown formatting
-            # Skip the page separator line if it exists
-            elif line.strip() and not line.startswith('{') and not line.startswith('#'):
-                description_lines.append(line)
-        
+    Args:
+        lines: Lines of the markdown, e.g. an open file or content.splitlines()
+    
+    Yields:
+        One slide dictionary per non-empty page, numbered from 0
+    """
+    slide_number = 0
+    description_lines: List[str] = []
+    images: List[Dict[str, str]] = []
+    has_content = False
+    
+    def make_slide():
         # Join all description lines with newlines to preserve markdown structure
-        description = '\n'.join(description_lines)
-        
-        slide_data.append({
-            "slide_number": i,
-            "description": description,
+        return {
+            "slide_number": slide_number,
+            "description": '\n'.join(description_lines),
             "desc_summary": "",  # Will be filled by LLM later
             "images": images
-        })
+        }
     
-    return slide_data
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if _SEPARATOR_LINE.match(line):
+            if has_content:
+                yield make_slide()
+                slide_number += 1
+            description_lines, images, has_content = [], [], False
+            continue
+        if not line.strip():
+            continue
+        has_content = True
+        # Check for image references
+        if line.startswith('!['):
+            match = _IMAGE_PATH.search(line)
+            if match:
+                images.append({
+                    "path": match.group(1),
+                    "description": ""  # Will be filled by LLM later
+                })
+        # Collect all non-image lines as description, preserving markdown formatting
+        elif not line.startswith('{') and not line.startswith('#'):
+            description_lines.append(line)
+    
+    if has_content:
+        yield make_slide()
+
+def extract_slide_content(markdown_content: str) -> List[Dict[str, Any]]:
+    return list(iter_slide_content(markdown_content.splitlines()))
 
 def generate_summary(text: str, multimodal_llm) -> str:
     """
@@ -52,7 +91,7 @@ def generate_summary(text: str, multimodal_llm) -> str:
     Returns:
         Generated summary as a string
     """
-    prompt = f"""Summarize in exactly one sentence without any preamble or additional text: {text}"""
+    prompt = SUMMARY_PROMPT.format(text=text)
     
     try:
         summary = multimodal_llm.generate_text(prompt)
@@ -61,68 +100,397 @@ def generate_summary(text: str, multimodal_llm) -> str:
         print(f"Error generating summary: {str(e)}")
         return ""
 
-def generate_metadata(markdown_file_path: str, multimodal_llm=None) -> str:
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return len(text) // 4 + 1
+
+def pack_batches(texts: List[str], max_items: int, token_budget: int) -> List[List[int]]:
     """
-    Generate metadata JSON from markdown file and optionally generate image descriptions and summaries using LLM.
+    Group consecutive texts into batches of at most max_items and token_budget tokens.
+        
+    Returns:
+        Lists of indices into texts; a text larger than the budget gets a batch of its own
+    """
+    batches = []
+    current = []
+    tokens = 0
+    for index, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if current and (len(current) >= max_items or tokens + cost > token_budget):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(index)
+        tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def generate_batch_summaries(texts: List[str], multimodal_llm) -> List[Optional[str]]:
+    """
+    Summarize several slides with one request.
+        
+    Args:
+        texts: Slide texts to summarize
+        multimodal_llm: MultimodalLLM instance for generating summaries
+        
+    Returns:
+        One summary per text, None for entries the response didn't provide
+    """
+    slides_block = "\n\n".join(f"Slide {i + 1}:\n{text}" for i, text in enumerate(texts))
+    prompt = BATCH_SUMMARY_PROMPT.format(count=len(texts), slides=slides_block)
+    try:
+        return parse_json_array(multimodal_llm.generate_text(prompt), len(texts))
+    except Exception as e:
+        print(f"Error generating batch summary: {str(e)}")
+        return [None] * len(texts)
+
+def summarize_slides(slides: List[Dict[str, Any]], multimodal_llm, batch_size: int = 1,
+                     token_budget: int = 2000, journal: Optional[EnrichmentJournal] = None) -> tuple:
+    """
+    Fill desc_summary for every slide with content, reusing cached summaries.
+        
+    Args:
+        slides: Slide dictionaries from extract_slide_content
+        multimodal_llm: MultimodalLLM instance, optionally carrying an LLMCache
+        batch_size: Maximum slides summarized per request (1 = one request per slide)
+        token_budget: Approximate slide text tokens packed into one batched request
+        journal: Optional EnrichmentJournal; summaries found in it are reused and
+                 new ones are appended as each request completes
+        
+    Returns:
+        Tuple of (cache hits, cache misses)
+    """
+    cache = getattr(multimodal_llm, "cache", None)
+    hits = 0
+    pending = []
+    for slide in slides:
+        if not slide["description"].strip():  # Only generate summary if there's content
+            continue
+        key = None
+        if cache is not None or journal is not None:
+            key = LLMCache.make_key("summary", multimodal_llm.model_name,
+                                    SUMMARY_PROMPT.format(text=slide["description"]))
+        if journal is not None:
+            done = journal.get(key)
+            if done is not None:
+                slide["desc_summary"] = done
+                continue
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                slide["desc_summary"] = cached
+                hits += 1
+                continue
+        pending.append((slide, key))
+        
+    texts = [slide["description"] for slide, _ in pending]
+    summaries: List[Optional[str]] = [None] * len(pending)
+        
+    def checkpoint(index: int, summary: Optional[str]):
+        if summary and journal is not None:
+            journal.set(pending[index][1], summary)
+        
+    def summarize_batch(batch: List[int]) -> List[Optional[str]]:
+        if len(batch) == 1:
+            return [None]
+        batch_summaries = generate_batch_summaries([texts[i] for i in batch], multimodal_llm)
+        for index, summary in zip(batch, batch_summaries):
+            checkpoint(index, summary)
+        return batch_summaries
+        
+    def summarize_one(index: int) -> str:
+        summary = generate_summary(texts[index], multimodal_llm)
+        checkpoint(index, summary)
+        return summary
+        
+    if batch_size > 1 and len(pending) > 1:
+        batches = pack_batches(texts, batch_size, token_budget)
+        results = multimodal_llm.map_concurrent(summarize_batch, batches)
+        for batch, batch_summaries in zip(batches, results):
+            for index, summary in zip(batch, batch_summaries):
+                summaries[index] = summary
+        
+    # Slides not covered by a valid batch entry get their own request,
+    # up to the client's in-flight limit
+    retry = [index for index, summary in enumerate(summaries) if summary is None]
+    for index, summary in zip(retry, multimodal_llm.map_concurrent(summarize_one, retry)):
+        summaries[index] = summary
+        
+    for (slide, key), summary in zip(pending, summaries):
+        slide["desc_summary"] = summary
+        if cache is not None and summary:
+            cache.set(key, summary)
+        
+    return hits, len(pending) if cache is not None else 0
+
+def describe_slide_images(slides: List[Dict[str, Any]], base_dir: str, multimodal_llm,
+                          image_grouper=None, journal: Optional[EnrichmentJournal] = None) -> tuple:
+    """
+    Fill the description of every image, describing each distinct image once.
+        
+    Images are grouped by the hash of their bytes, so repeated logos and footers
+    cost one request per deck, and none at all when already in the cache. With an
+    ImageGrouper, near-duplicates (re-crops, re-encodes) are merged as well and
+    every image gets the grouper's id for its group.
+        
+    Args:
+        slides: Slide dictionaries from extract_slide_content
+        base_dir: Directory the image paths are relative to
+        multimodal_llm: MultimodalLLM instance, optionally carrying an LLMCache
+        image_grouper: Optional ImageGrouper for perceptual near-duplicate collapsing
+        journal: Optional EnrichmentJournal; descriptions found in it are reused and
+                 new ones are appended as each request completes
+        
+    Returns:
+        Tuple of (cache hits, cache misses)
+    """
+    cache = getattr(multimodal_llm, "cache", None)
+        
+    def cache_key(content_hash):
+        return LLMCache.make_key("image", multimodal_llm.model_name, BATCH_DESCRIBE_PROMPT, content_hash)
+        
+    # content hash -> (representative path, image entries sharing those bytes)
+    exact: Dict[str, tuple] = {}
+    for slide in slides:
+        for img in slide["images"]:
+            full_path = os.path.join(base_dir, img["path"])
+            try:
+                content_hash = hash_file(full_path)
+            except OSError:
+                content_hash = f"missing:{full_path}"
+            exact.setdefault(content_hash, (full_path, []))[1].append(img)
+        
+    # Merge exact groups that are perceptual near-duplicates
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for content_hash, (full_path, images) in exact.items():
+        group = None
+        if image_grouper is not None and not content_hash.startswith("missing:"):
+            group = image_grouper.assign(full_path)
+        key = ("group", group.group_id) if group is not None else content_hash
+        entry = merged.setdefault(key, {"group": group, "path": full_path, "hashes": [], "images": []})
+        entry["hashes"].append(content_hash)
+        entry["images"].extend(images)
+        
+    hits = 0
+    pending = {}
+    for entry in merged.values():
+        if image_grouper is not None:
+            # Ids come from the grouper, so they hold across JSONL windows (and decks in run scope)
+            group = entry["group"]
+            group_id = group.group_id if group is not None else image_grouper.solo_id(entry["hashes"][0])
+            for img in entry["images"]:
+                img["group"] = group_id
+            
+        # A description found earlier in the run for this group is reused as is
+        group = entry["group"]
+        description = group.description if group is not None else None
+            
+        hashes = [h for h in entry["hashes"] if not h.startswith("missing:")]
+        if description is None and journal is not None:
+            description = next(filter(None, (journal.get(cache_key(h)) for h in hashes)), None)
+        if description is None and cache is not None:
+            description = next(filter(None, (cache.get(cache_key(h)) for h in hashes)), None)
+            if description is not None:
+                hits += 1
+            
+        if description is not None:
+            for img in entry["images"]:
+                img["description"] = description
+            continue
+        pending[entry["path"]] = entry
+        
+    def checkpoint(full_path: str, description: str):
+        if journal is not None:
+            for content_hash in pending[full_path]["hashes"]:
+                if not content_hash.startswith("missing:"):
+                    journal.set(cache_key(content_hash), description)
+        
+    if pending:
+        descriptions = multimodal_llm.batch_describe_images(list(pending.keys()), on_result=checkpoint)
+            
+        # Update metadata with descriptions, fanning each one out to its group
+        for full_path, entry in pending.items():
+            if full_path not in descriptions:
+                continue
+            description = descriptions[full_path]
+            for img in entry["images"]:
+                img["description"] = description
+            if not description:
+                continue
+            if entry["group"] is not None:
+                entry["group"].description = description
+            if cache is not None:
+                for content_hash in entry["hashes"]:
+                    if not content_hash.startswith("missing:"):
+                        cache.set(cache_key(content_hash), description)
+        
+    return hits, len(pending) if cache is not None else 0
+
+def enrich_slides(slides: List[Dict[str, Any]], multimodal_llm, image_grouper=None,
+                  summary_batch_size: int = 1, summary_token_budget: int = 2000,
+                  deck: Optional[str] = None, base_dir: str = "",
+                  progress: Optional[Callable[[str, int, Optional[int]], None]] = None,
+                  slide_count: Optional[int] = None,
+                  journal: Optional[EnrichmentJournal] = None) -> tuple:
+    """
+    Fill in the summaries and image descriptions of a group of slides.
+        
+    Returns:
+        Tuple of (cache hits, cache misses)
+    """
+    with get_metrics().stage("summaries", deck, profile=False):
+        summary_hits, summary_misses = summarize_slides(slides, multimodal_llm, summary_batch_size,
+                                                        summary_token_budget, journal)
+    if progress is not None:
+        for slide in slides:
+            progress("summarized", slide["slide_number"], slide_count)
+        
+    with get_metrics().stage("describe_images", deck, profile=False):
+        image_hits, image_misses = describe_slide_images(slides, base_dir, multimodal_llm, image_grouper,
+                                                         journal)
+    if progress is not None:
+        for slide in slides:
+            progress("described", slide["slide_number"], slide_count)
+        
+    return summary_hits + image_hits, summary_misses + image_misses
+
+def count_missing_outputs(slides: List[Dict[str, Any]], base_dir: str) -> int:
+    """
+    Count summaries and image descriptions enrichment should have produced but didn't.
     
+    The client returns "" once its retries are exhausted, so an empty summary of a slide
+    with content, or an empty description of an image that exists, marks a failed request.
+    """
+    missing = sum(1 for slide in slides if slide["description"].strip() and not slide["desc_summary"])
+    missing += sum(
+        1 for slide in slides for img in slide["images"]
+        if not img["description"] and os.path.exists(os.path.join(base_dir, img["path"]))
+    )
+    return missing
+
+def metadata_path_for(markdown_file_path: str, metadata_format: str = "json") -> str:
+    """Path of the metadata file generate_metadata writes for a markdown file"""
+    suffix = '_metadata.jsonl' if metadata_format == "jsonl" else '_metadata.json'
+    return os.path.join(
+        os.path.dirname(markdown_file_path),
+        os.path.splitext(os.path.basename(markdown_file_path))[0] + suffix
+    )
+
+def generate_metadata(markdown_file_path: str, multimodal_llm=None, image_grouper=None,
+                      summary_batch_size: int = 1, summary_token_budget: int = 2000,
+                      progress: Optional[Callable[[str, int, Optional[int]], None]] = None,
+                      markdown_content: Optional[str] = None, metadata_format: str = "json",
+                      deck_name: Optional[str] = None) -> str:
+    """
+    Generate metadata JSON from markdown file and optionally generate image descriptions and summaries using LLM.
+        
     Args:
         markdown_file_path: Path to the markdown file
         multimodal_llm: Optional MultimodalLLM instance for generating descriptions and summaries
-    
+        image_grouper: Optional ImageGrouper collapsing near-duplicate images before description
+        summary_batch_size: Maximum slides summarized per request (1 = one request per slide)
+        summary_token_budget: Approximate slide text tokens packed into one batched request
+        progress: Called as progress(event, slide_number, slide_count) for each slide once
+                  it is "summarized" and once its images are "described" (slide_count is
+                  None in the JSONL format)
+        markdown_content: The markdown just written to markdown_file_path, to skip reading it back
+        metadata_format: "json" writes one document once enrichment is done; "jsonl" writes
+                         a header line, then each slide as soon as it is enriched, then a
+                         trailer line with the slide and image group counts
+        deck_name: Name the summaries and describe_images timings are recorded under, so
+                   they join the deck's other stages (default: the markdown file name)
+        
     Returns:
-        Path to the generated metadata JSON file
-    """
-    # Read the markdown file
-    with open(markdown_file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+        Path to the generated metadata file
     
-    # Extract slide data
-    slides = extract_slide_content(content)
-    
-    # Create metadata structure
-    metadata = {
-        "source_file": os.path.basename(markdown_file_path),
+    Raises:
+        RuntimeError: If some summaries or image descriptions could not be generated. The
+                      metadata is still written, and the journal is kept so a rerun resumes
+    """
+    deck = os.path.basename(markdown_file_path)
+    base_dir = os.path.dirname(markdown_file_path)
+    output_path = metadata_path_for(markdown_file_path, metadata_format)
+    header = {
+        "source_file": deck,
         "parsed_at": datetime.now().isoformat(),
-        "slide_count": len(slides),
-        "slides": slides
     }
-    
-    # Write to JSON file
-    output_path = os.path.join(
-        os.path.dirname(markdown_file_path),
-        os.path.splitext(os.path.basename(markdown_file_path))[0] + '_metadata.json'
-    )
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
-    
-    # If LLM is provided, generate descriptions for all images and summaries for all slides
+    # Outputs are journaled as they arrive, so an interrupted run resumes where it stopped
+    journal = None
     if multimodal_llm:
-        # First, generate summaries for all slides
-        for slide in slides:
-            if slide["description"].strip():  # Only generate summary if there's content
-                slide["desc_summary"] = generate_summary(slide["description"], multimodal_llm)
-        
-        # Then, generate descriptions for all images
-        image_paths = []
-        for slide in slides:
-            for img in slide["images"]:
-                full_path = os.path.join(os.path.dirname(markdown_file_path), img["path"])
-                image_paths.append(full_path)
+        journal = EnrichmentJournal(os.path.splitext(output_path)[0] + '.journal')
+        if journal.resumed:
+            print(f"Resuming {deck}: {journal.resumed} LLM outputs recovered from the last run")
+    enrich_args = dict(image_grouper=image_grouper, summary_batch_size=summary_batch_size,
+                       summary_token_budget=summary_token_budget, deck=deck_name or deck, base_dir=base_dir,
+                       progress=progress, journal=journal)
+    cache_hits = 0
+    cache_misses = 0
+    missing = 0
         
-        if image_paths:
-            descriptions = multimodal_llm.batch_describe_images(image_paths)
+    # Tokenize the markdown handed over by the write stage, or stream it from disk
+    if markdown_content is not None:
+        source = nullcontext(markdown_content.splitlines())
+    else:
+        source = open(markdown_file_path, 'r', encoding='utf-8')
+    try:
+        with source as lines:
+            slides_iter = iter_slide_content(lines)
             
-            # Update metadata with descriptions
-            for slide in slides:
-                for img in slide["images"]:
-                    full_path = os.path.join(os.path.dirname(markdown_file_path), img["path"])
-                    if full_path in descriptions:
-                        img["description"] = descriptions[full_path]
-        
-        # Write updated metadata with both summaries and image descriptions
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+            if metadata_format == "jsonl":
+                # Slides are enriched a window at a time and written as soon as they are done
+                trailer = {"slide_count": 0}
+                groups = set()
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(header, ensure_ascii=False) + '\n')
+                    while True:
+                        window = list(itertools.islice(slides_iter, JSONL_WINDOW_SLIDES))
+                        if not window:
+                            break
+                        if multimodal_llm:
+                            hits, misses = enrich_slides(window, multimodal_llm, **enrich_args)
+                            cache_hits += hits
+                            cache_misses += misses
+                            missing += count_missing_outputs(window, base_dir)
+                        trailer["slide_count"] += len(window)
+                        groups.update(img["group"] for slide in window for img in slide["images"] if "group" in img)
+                        f.write(''.join(json.dumps(slide, ensure_ascii=False) + '\n' for slide in window))
+                        f.flush()
+                    # Totals only known at the end go in a trailer line (it has no slide_number)
+                    if multimodal_llm and image_grouper is not None:
+                        trailer["image_groups"] = len(groups)
+                    f.write(json.dumps(trailer, ensure_ascii=False) + '\n')
+            else:
+                slides = list(slides_iter)
+                # Create metadata structure
+                metadata = {**header, "slide_count": len(slides), "slides": slides}
+                
+                # If LLM is provided, generate summaries for all slides and descriptions for all images
+                if multimodal_llm:
+                    cache_hits, cache_misses = enrich_slides(slides, multimodal_llm,
+                                                             slide_count=len(slides), **enrich_args)
+                    missing = count_missing_outputs(slides, base_dir)
+                    if image_grouper is not None:
+                        metadata["image_groups"] = len({
+                            img["group"] for slide in slides for img in slide["images"] if "group" in img
+                        })
+                
+                # Written once, with both summaries and image descriptions
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    json.dump(metadata, f, indent=2, ensure_ascii=False)
+    finally:
+        if journal is not None:
+            journal.close()
+    
+    if multimodal_llm and getattr(multimodal_llm, "cache", None) is not None:
+        print(f"LLM cache for {deck}: {cache_hits} hits, {cache_misses} misses")
+    
+    if missing:
+        # The journal keeps what did succeed, so a rerun only asks for the rest
+        raise RuntimeError(f"{missing} summaries or image descriptions failed for {deck}; "
+                           f"rerun to resume from {journal.path}")
+    # Everything journaled is now in the metadata file
+    if journal is not None:
+        journal.discard()
     
     return output_path
 
@@ -0,0 +1,113 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+def dhash(image_path: str, hash_size: int = 8) -> int:
+    """
+    Compute a difference hash of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale thumbnail and
+    each bit records whether a pixel is brighter than its right neighbour, so
+    re-crops, resizes and re-encodes of the same picture land within a few bits.
+
+    Args:
+        image_path: Path to the image file
+        hash_size: Width/height of the hash grid (default: 8, giving a 64-bit hash)
+
+    Returns:
+        The hash as an integer
+    """
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        pixels = list(
+            img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS).getdata()
+        )
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+@dataclass
+class ImageGroup:
+    """Near-duplicate images sharing one representative and description"""
+    group_id: int
+    phash: int
+    representative: str
+    description: Optional[str] = None
+
+
+class ImageGrouper:
+    """
+    Assign images to near-duplicate groups by perceptual hash.
+
+    Use one instance per deck to collapse duplicates within a deck, or share one
+    instance across a run so a description found in one deck is reused by the next.
+    """
+
+    def __init__(self, threshold: int = 6):
+        """
+        Args:
+            threshold: Maximum Hamming distance between hashes in the same group
+        """
+        self.threshold = threshold
+        self.groups: List[ImageGroup] = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # Ids of images that couldn't be hashed, by content hash (or missing path)
+        self._solo_ids: Dict[str, int] = {}
+
+    def assign(self, image_path: str) -> Optional[ImageGroup]:
+        """
+        Return the group of the closest earlier image within the threshold,
+        or a new group represented by this image.
+
+        Args:
+            image_path: Path to the image file
+
+        Returns:
+            The image's group, or None when the image cannot be read
+        """
+        try:
+            phash = dhash(image_path)
+        except Exception as e:
+            print(f"Error hashing image {image_path}: {str(e)}")
+            return None
+
+        with self._lock:
+            best = None
+            best_distance = self.threshold + 1
+            for group in self.groups:
+                distance = hamming_distance(phash, group.phash)
+                if distance < best_distance:
+                    best, best_distance = group, distance
+                    if distance == 0:
+                        break
+            if best is None:
+                best = ImageGroup(group_id=self._next_id, phash=phash, representative=image_path)
+                self._next_id += 1
+                self.groups.append(best)
+            return best
+
+    def solo_id(self, key: str) -> int:
+        """
+        Return a group id for an image that couldn't be grouped, unique among the
+        grouper's ids and the same every time the key is seen.
+
+        Args:
+            key: Content hash of the image (or a placeholder for a missing file)
+        """
+        with self._lock:
+            if key not in self._solo_ids:
+                self._solo_ids[key] = self._next_id
+                self._next_id += 1
+            return self._solo_ids[key]
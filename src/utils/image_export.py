@@ -0,0 +1,146 @@
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# PIL format names for the extensions Marker and python-pptx give images
+_FORMATS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "gif": "GIF", "bmp": "BMP", "tif": "TIFF",
+            "tiff": "TIFF", "webp": "WEBP"}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    """Return the encoder pool shared by every ImageWriter in this process"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                               thread_name_prefix="image-writer")
+    return _executor
+
+
+def _extension(name: str, raw: bool = False) -> str:
+    ext = os.path.splitext(name)[1].lstrip(".").lower()
+    if raw:
+        # Bytes are written unchanged, so the name must keep their real format (e.g. wmf)
+        return ext if ext.isalnum() else "bin"
+    return ext if ext in _FORMATS else "png"
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _encode(img, ext: str) -> bytes:
+    fmt = _FORMATS[ext]
+    if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class ImageWriter:
+    """
+    Write a deck's extracted images under content-addressed names.
+
+    Images that arrive as bytes (pictures embedded in the PPTX) are written
+    exactly as embedded, without decoding. Rendered images (PIL images from
+    Marker) are encoded on a shared thread pool. Every file is named after the
+    hash of its content, so an image repeated across slides is stored once.
+
+    Use as a context manager; leaving the block waits for every pending write.
+    Since names change with content, call prune() once the deck is written to
+    remove images left over from an earlier version of it.
+    """
+
+    def __init__(self, image_dir: Path, max_workers: int = 4):
+        """
+        Args:
+            image_dir: Directory images are written to
+            max_workers: Size of the process-wide encoder pool (fixed on first use)
+        """
+        self.image_dir = Path(image_dir)
+        self.image_dir.mkdir(parents=True, exist_ok=True)
+        self._executor = _get_executor(max_workers)
+        self._futures: List[Future] = []
+        self._stored = set()
+        self.written = 0
+        self.reused = 0
+
+    def add(self, name: str, img_obj: Any) -> str:
+        """
+        Queue one image for writing.
+
+        Args:
+            name: Name the parser gave the image. Its extension picks the format PIL
+                  images are encoded in, and is kept as is for bytes
+            img_obj: Original image bytes or a PIL image
+
+        Returns:
+            File name the image is stored under in image_dir
+        """
+        ext = _extension(name, raw=isinstance(img_obj, bytes))
+        if isinstance(img_obj, bytes):
+            digest = hashlib.sha256(img_obj).hexdigest()
+        else:
+            digest = hashlib.sha256(
+                f"{img_obj.mode}:{img_obj.size}".encode() + img_obj.tobytes()
+            ).hexdigest()
+        stored = f"{digest[:20]}.{ext}"
+
+        if stored in self._stored or (self.image_dir / stored).exists():
+            self._stored.add(stored)
+            self.reused += 1
+            return stored
+        self._stored.add(stored)
+        self.written += 1
+
+        path = self.image_dir / stored
+        if isinstance(img_obj, bytes):
+            self._futures.append(self._executor.submit(_write_atomic, path, img_obj))
+        else:
+            self._futures.append(self._executor.submit(
+                lambda: _write_atomic(path, _encode(img_obj, ext))
+            ))
+        return stored
+
+    def add_all(self, images: Dict[str, Any]) -> Dict[str, str]:
+        """Queue several images; returns {parser name: stored file name}"""
+        return {name: self.add(name, img_obj) for name, img_obj in images.items()}
+
+    def wait(self):
+        """Block until every queued image is on disk, re-raising the first failure"""
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def prune(self) -> int:
+        """
+        Delete files in image_dir that this writer didn't store, e.g. images of a
+        previous run of a deck that has since changed.
+
+        Returns:
+            Number of files removed
+        """
+        self.wait()
+        removed = 0
+        for path in self.image_dir.iterdir():
+            if path.is_file() and path.name not in self._stored:
+                path.unlink()
+                removed += 1
+        return removed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.wait()
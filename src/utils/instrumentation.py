@@ -0,0 +1,241 @@
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, float("inf"))
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS counter for this process (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process since the last reset"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # ru_maxrss is in KiB on Linux and bytes on macOS; never reset
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if os.uname().sysname == "Darwin" else usage * 1024
+    except (ImportError, AttributeError):
+        return 0
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def merge(self, data: Dict[str, Any]):
+        self.count += data["count"]
+        self.total += data["sum"]
+        self.max = max(self.max, data["max"])
+        for index, count in enumerate(data["buckets"].values()):
+            self.counts[index] += count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "buckets": {("+Inf" if b == float("inf") else str(b)): c for b, c in zip(self.buckets, self.counts)},
+        }
+
+
+class RunMetrics:
+    """
+    Per-process collector of stage timings, per-deck peak memory and LLM latency.
+
+    Stage timings cover conversion, parsing, image writing and LLM enrichment;
+    LLM latencies are recorded per Ollama endpoint. With profiling enabled, each
+    timed stage also dumps cProfile stats to profile_dir.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Histogram] = {}
+        self.llm: Dict[str, Histogram] = {}
+        self.decks: Dict[str, Dict[str, Any]] = {}
+        self.counters: Dict[str, float] = {}
+        self.profile_dir: Optional[Path] = None
+        self._run_peak_rss = 0
+        # Off in long-running services, where decks overlap and never stop arriving
+        self.track_decks = True
+
+    def enable_profiling(self, profile_dir: Path):
+        self.profile_dir = Path(profile_dir)
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+    def start_deck(self, deck: str):
+        """Mark the start of a deck so its peak RSS is measured from here"""
+        if not self.track_decks:
+            return
+        with self._lock:
+            # Kept before the counter is reset, so the run's peak survives every deck
+            self._run_peak_rss = max(self._run_peak_rss, peak_rss_bytes())
+        _reset_peak_rss()
+        with self._lock:
+            self.decks.setdefault(deck, {"stages": {}, "peak_rss_bytes": 0})
+
+    def run_peak_rss_bytes(self) -> int:
+        """Peak RSS of this process over the whole run, across per-deck resets"""
+        with self._lock:
+            return max(self._run_peak_rss, peak_rss_bytes())
+
+    def observe_stage(self, stage: str, seconds: float, deck: Optional[str] = None):
+        with self._lock:
+            self.stages.setdefault(stage, Histogram()).observe(seconds)
+            if deck is not None and self.track_decks:
+                entry = self.decks.setdefault(deck, {"stages": {}, "peak_rss_bytes": 0})
+                entry["stages"][stage] = entry["stages"].get(stage, 0.0) + seconds
+                entry["peak_rss_bytes"] = max(entry["peak_rss_bytes"], peak_rss_bytes())
+
+    def observe_llm(self, endpoint: str, seconds: float):
+        with self._lock:
+            self.llm.setdefault(endpoint, Histogram()).observe(seconds)
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, stage: str, deck: Optional[str] = None, profile: bool = True):
+        """
+        Time a stage, and profile it when profiling is enabled.
+
+        Args:
+            stage: Stage name
+            deck: Deck the work belongs to, if any
+            profile: Set to False for sub-stages timed inside a profiled stage
+        """
+        profiler = None
+        if profile and self.profile_dir is not None:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another thread is already profiling (Python 3.12+ allows one profiler)
+                profiler = None
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            if profiler is not None:
+                profiler.disable()
+                name = re.sub(r"[^\w.-]+", "_", f"{stage}_{deck or 'run'}")
+                profiler.dump_stats(str(self.profile_dir / f"{name}.prof"))
+            self.observe_stage(stage, elapsed, deck)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": {name: h.to_dict() for name, h in self.stages.items()},
+                "llm_requests": {name: h.to_dict() for name, h in self.llm.items()},
+                "decks": json.loads(json.dumps(self.decks)),
+                "counters": dict(self.counters),
+            }
+
+    def drain(self) -> Dict[str, Any]:
+        """Return a snapshot and reset, for shipping a worker's metrics to the parent"""
+        data = self.snapshot()
+        with self._lock:
+            self.stages, self.llm, self.decks, self.counters = {}, {}, {}, {}
+        return data
+
+    def merge(self, data: Dict[str, Any]):
+        """Fold a snapshot from another process into this one"""
+        with self._lock:
+            for name, hist in data["stages"].items():
+                self.stages.setdefault(name, Histogram()).merge(hist)
+            for name, hist in data["llm_requests"].items():
+                self.llm.setdefault(name, Histogram()).merge(hist)
+            self.decks.update(data["decks"])
+            for name, value in data["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def write_report(self, path: Path, extra: Optional[Dict[str, Any]] = None) -> Path:
+        """Write the run report as JSON"""
+        report = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), **(extra or {}), **self.snapshot()}
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return path
+
+    def write_prometheus(self, path: Path) -> Path:
+        """Write the metrics in the Prometheus text exposition format"""
+        data = self.snapshot()
+        lines = []
+
+        def histogram(metric: str, label: str, histograms: Dict[str, Dict[str, Any]], help_text: str):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, hist in histograms.items():
+                cumulative = 0
+                for bound, count in hist["buckets"].items():
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {hist["sum"]}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {hist["count"]}')
+
+        histogram("slidesage_stage_seconds", "stage", data["stages"], "Time spent per pipeline stage")
+        histogram("slidesage_llm_request_seconds", "endpoint", data["llm_requests"], "Ollama request latency")
+
+        lines.append("# HELP slidesage_deck_peak_rss_bytes Peak resident memory while processing a deck")
+        lines.append("# TYPE slidesage_deck_peak_rss_bytes gauge")
+        for deck, entry in data["decks"].items():
+            escaped = deck.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'slidesage_deck_peak_rss_bytes{{deck="{escaped}"}} {entry["peak_rss_bytes"]}')
+
+        for name, value in data["counters"].items():
+            metric = "slidesage_" + re.sub(r"\W+", "_", name)
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+
+_metrics = RunMetrics()
+
+
+def get_metrics() -> RunMetrics:
+    """Return the metrics collector for this process"""
+    return _metrics
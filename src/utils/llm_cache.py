@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 hex digest of raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent, size-bounded LRU cache for LLM outputs.
+
+    Entries are keyed by the hash of the input content (image bytes or text)
+    together with the model name and the prompt, so the same logo or unchanged
+    slide text is only sent to the model once across decks and reruns.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            path: SQLite file holding the cache
+            max_bytes: Total size of cached values before least recently used entries are evicted
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Shared between threads behind the lock; the timeout lets worker processes wait on each other
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+        self._conn.commit()
+        self._init_total()
+
+    def _init_total(self):
+        """Keep the total size of values in a meta row, maintained by triggers, so eviction checks are O(1)"""
+        with self._lock:
+            # Immediate, so concurrent processes don't both seed the total from an existing cache
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (name, value) "
+                "SELECT 'total_size', COALESCE(SUM(size), 0) FROM entries"
+            )
+            for event, change in (("INSERT", "NEW.size"), ("UPDATE OF size", "NEW.size - OLD.size"),
+                                  ("DELETE", "-OLD.size")):
+                name = event.split()[0].lower()
+                self._conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS entries_size_{name} AFTER {event} ON entries BEGIN "
+                    f"UPDATE meta SET value = value + {change} WHERE name = 'total_size'; END"
+                )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(kind: str, model_name: str, prompt: str, content_hash: str = "") -> str:
+        """
+        Build a cache key.
+
+        Args:
+            kind: Kind of output, e.g. "summary" or "image"
+            model_name: Model that produced the output
+            prompt: Prompt sent with the content
+            content_hash: Hash of the image bytes, if any
+
+        Returns:
+            Hex digest identifying the request
+        """
+        raw = "\x00".join([kind, model_name, prompt, content_hash])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value and mark it as recently used, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str):
+        """Store a value and evict least recently used entries beyond max_bytes"""
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete skips the size triggers
+            self._conn.execute(
+                "INSERT INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "last_used = excluded.last_used",
+                (key, value, size, time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Walks the last_used index only as far as needed
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY last_used")
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class EnrichmentJournal:
+    """
+    Append-only record of the LLM outputs produced while enriching one deck.
+
+    Every summary and image description is appended and flushed as soon as it
+    arrives, keyed like LLMCache entries. If enrichment is interrupted, the next
+    run reads the journal back and only asks the model for what is missing. The
+    journal is deleted once the deck's metadata has been written.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Journal file (JSON lines); entries already in it are loaded
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry["value"]
+                    except (ValueError, KeyError, TypeError):
+                        # A line cut short by the interruption
+                        continue
+        self.resumed = len(self.entries)
+        self._file = None
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self.entries.get(key)
+
+    def set(self, key: str, value: str):
+        line = json.dumps({"key": key, "value": value}, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            self.entries[key] = value
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        """Close and delete the journal once its outputs are safely written"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,27 +1,201 @@
 import base64
+import io
 import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
-import requests
+from typing import Callable, Dict, List, Optional, TypeVar, Union
 import os
-import ollama
+
+from src.utils.instrumentation import get_metrics
+from src.utils.ollama_pool import EndpointPool
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Prompt used for image descriptions in batch_describe_images
+BATCH_DESCRIBE_PROMPT = "Describe this image exactly in one sentence without any preamble or additional text"
+
+# Prompt used when several images are described in one request
+MULTI_DESCRIBE_PROMPT = (
+    "Describe each of the following {count} images exactly in one sentence without any preamble. "
+    "Respond with only a JSON array of {count} strings, one description per image, in the order the images are given."
+)
+
+def parse_json_array(response: str, count: int) -> List[Optional[str]]:
+    """
+    Parse a model response expected to hold a JSON array of count strings.
+    
+    Args:
+        response: Raw model output, possibly wrapped in a code fence or prose
+        count: Number of entries expected
+    
+    Returns:
+        One entry per expected item; None where the entry is missing or not a usable string.
+        When the array has the wrong length the alignment can't be trusted, so all are None.
+    """
+    start = response.find('[')
+    end = response.rfind(']')
+    if start == -1 or end < start:
+        return [None] * count
+    try:
+        data = json.loads(response[start:end + 1])
+    except ValueError:
+        return [None] * count
+    if not isinstance(data, list) or len(data) != count:
+        return [None] * count
+    return [item.strip() if isinstance(item, str) and item.strip() else None for item in data]
 
 class MultimodalLLM:
-    def __init__(self, model_name: str = "gemma3:4b", base_url: str = "http://localhost:11434"):
+    def __init__(self, model_name: str = "gemma3:4b", base_url: Union[str, List[str]] = "http://localhost:11434",
+                 max_concurrency: int = 1, cache=None, max_image_side: Optional[int] = None,
+                 images_per_request: int = 1, timeout: float = 300.0, max_retries: int = 3,
+                 backoff: float = 1.0):
         """
         Initialize the MultimodalLLM with Ollama configuration.
         
         Args:
             model_name: Name of the model to use (default: "gemma3:4b")
-            base_url: Base URL for Ollama API (default: "http://localhost:11434")
+            base_url: Base URL for Ollama API, or several (a list or comma separated)
+                      to spread requests across servers (default: "http://localhost:11434")
+            max_concurrency: Maximum requests in flight per server. Match it to the
+                             number of requests Ollama serves in parallel
+                             (OLLAMA_NUM_PARALLEL); the limit actually used adapts
+                             to response times below it (default: 1)
+            cache: Optional LLMCache consulted by generate_metadata before calling Ollama
+            max_image_side: Downscale images so their longest side is at most this many
+                            pixels before sending, e.g. the model's input resolution
+                            (default: send the file as is)
+            images_per_request: Images described per request in batch_describe_images (default: 1)
+            timeout: Seconds to wait for a response before giving up on an attempt (default: 300)
+            max_retries: Further attempts after a timeout, connection error or 429/5xx (default: 3)
+            backoff: Base delay in seconds, doubled on every further attempt (default: 1)
         """
         self.model_name = model_name
-        self.base_url = base_url
-        self.client = ollama.Client()
+        self.max_concurrency = max(1, max_concurrency)
+        self.endpoints = EndpointPool(base_url, self.max_concurrency)
+        self.base_url = self.endpoints.endpoints[0].url
+        self.cache = cache
+        self.max_image_side = max_image_side
+        self.images_per_request = max(1, images_per_request)
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+    
+    @property
+    def session(self):
+        """One keep-alive session shared by every request, sized for the in-flight limit"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    # Imported on first request so runs that never call the model start faster
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=len(self.endpoints.endpoints),
+                                          pool_maxsize=self.max_concurrency)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+    
+    def _post(self, endpoint: str, payload: dict) -> dict:
+        """
+        POST to an Ollama endpoint over the pooled session, on the server with the
+        shortest expected wait and within its adaptive in-flight limit.
+        
+        Timeouts, connection errors and 429/5xx responses are retried up to max_retries
+        times with exponential backoff and jitter, each attempt picking a server afresh.
+        Other error responses are retried on servers that haven't returned one yet, and
+        raised once no such server is left.
+        """
+        import requests
+        
+        multiple = len(self.endpoints.endpoints) > 1
+        rejected = set()  # Servers that answered this request with a non-retryable error
+        error, transient = None, True
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                get_metrics().increment("llm_retries")
+                if transient:
+                    # Waits outside the in-flight limit so other requests keep going
+                    time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.0))
+            server = self.endpoints.acquire(exclude=rejected)
+            if server is None:
+                raise error
+            start_time = time.perf_counter()
+            try:
+                response = self.session.post(f"{server.url}{endpoint}", json=payload,
+                                             timeout=(min(10.0, self.timeout), self.timeout))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.endpoints.release(server, endpoint, None, ok=False)
+                error, transient = e, True
+                continue
+            except BaseException:
+                self.endpoints.release(server, endpoint, None, ok=False)
+                raise
+            latency = time.perf_counter() - start_time
+            get_metrics().observe_llm(f"{server.url}{endpoint}" if multiple else endpoint, latency)
+            if response.status_code >= 400:
+                # Any error counts against the server, e.g. a 404 from one that lacks the model
+                self.endpoints.release(server, endpoint, None, ok=False)
+                error = requests.HTTPError(f"{response.status_code} from {server.url}{endpoint}", response=response)
+                transient = response.status_code in RETRY_STATUSES
+                if not transient:
+                    rejected.add(server.url)
+                    if not self.endpoints.has_live(exclude=rejected):
+                        raise error
+                continue
+            self.endpoints.release(server, endpoint, latency, ok=True)
+            return response.json()
+        raise error
+    
+    def map_concurrent(self, func: Callable[[T], R], items: List[T]) -> List[R]:
+        """
+        Apply func to every item with up to max_concurrency calls in flight per server.
+        
+        Args:
+            func: Function issuing one LLM request per item
+            items: Inputs to process
+            
+        Returns:
+            Results in the same order as items
+        """
+        items = list(items)
+        if self.endpoints.capacity == 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.endpoints.capacity, thread_name_prefix="slidesage-llm"
+                )
+        return list(self._executor.map(func, items))
+    
+    def close(self):
+        """Release the worker threads and pooled connections"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
         
     def _encode_image(self, image_path: str) -> str:
         """
-        Encode image to base64 string.
+        Encode image to base64 string, downscaled to max_image_side when set.
         
         Args:
             image_path: Path to the image file
@@ -30,7 +204,35 @@ class MultimodalLLM:
             Base64 encoded string of the image
         """
         with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+            data = image_file.read()
+        if self.max_image_side:
+            data = self._downscale(data)
+        return base64.b64encode(data).decode('utf-8')
+    
+    def _downscale(self, data: bytes) -> bytes:
+        """Resize to the model's input resolution and re-encode compactly in memory"""
+        from PIL import Image
+        
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                if max(img.size) <= self.max_image_side and img.format in ("JPEG", "PNG"):
+                    return data
+                img.thumbnail((self.max_image_side, self.max_image_side), Image.LANCZOS)
+                if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+                    # JPEG has no alpha; flatten onto white so transparent areas don't turn black
+                    img = img.convert("RGBA")
+                    background = Image.new("RGB", img.size, (255, 255, 255))
+                    background.paste(img, mask=img.getchannel("A"))
+                    img = background
+                elif img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+                buffer = io.BytesIO()
+                img.save(buffer, format="JPEG", quality=85, optimize=True)
+        except Exception as e:
+            print(f"Error downscaling image, sending original: {str(e)}")
+            return data
+        # Re-encoding can exceed a small, already compact original
+        return buffer.getvalue() if buffer.tell() < len(data) else data
         
     def describe_image(self, image_path: str, prompt: str = None) -> Optional[str]:
         """
@@ -62,16 +264,11 @@ class MultimodalLLM:
             }
             
             # Make API request
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json={
-                    "model": self.model_name,
-                    "messages": [message],
-                    "stream": False
-                }
-            )
-            response.raise_for_status()
-            result = response.json()
+            result = self._post("/api/chat", {
+                "model": self.model_name,
+                "messages": [message],
+                "stream": False
+            })
             
             # Extract content from response
             return result.get("message", {}).get("content", "").strip()
@@ -79,34 +276,89 @@ class MultimodalLLM:
             print(f"Error describing image {image_path}: {str(e)}")
             return None
         
-    def batch_describe_images(self, image_paths: List[str]) -> Dict[str, str]:
+    def batch_describe_images(self, image_paths: List[str],
+                              on_result: Optional[Callable[[str, str], None]] = None) -> Dict[str, str]:
         """
         Generate descriptions for multiple images in a batch.
         
         Args:
             image_paths: List of paths to images
+            on_result: Called with (image path, description) as soon as each image is described
             
         Returns:
             Dictionary mapping image paths to their descriptions
         """
-        descriptions = {}
-        for image_path in image_paths:
+        def describe(image_path):
             if not os.path.exists(image_path):
                 print(f"Image not found: {image_path}")
-                continue
+                return None
                 
             try:
-                response = self.client.generate(
-                    model=self.model_name,
-                    prompt="Describe this image exactly in one sentence without any preamble or additional text",
-                    images=[image_path]
-                )
-                descriptions[image_path] = response['response'].strip()
+                result = self._post("/api/generate", {
+                    "model": self.model_name,
+                    "prompt": BATCH_DESCRIBE_PROMPT,
+                    "images": [self._encode_image(image_path)],
+                    "stream": False
+                })
+                description = result['response'].strip()
             except Exception as e:
                 print(f"Error describing image {image_path}: {str(e)}")
-                descriptions[image_path] = ""
-                
+                return ""
+            if description and on_result is not None:
+                on_result(image_path, description)
+            return description
+        
+        def describe_group(group):
+            results = self._describe_group(group)
+            if on_result is not None:
+                for image_path, description in zip(group, results):
+                    if description:
+                        on_result(image_path, description)
+            return results
+        
+        descriptions = {}
+        if self.images_per_request > 1:
+            existing = []
+            for image_path in image_paths:
+                if os.path.exists(image_path):
+                    existing.append(image_path)
+                else:
+                    print(f"Image not found: {image_path}")
+            groups = [
+                existing[i:i + self.images_per_request]
+                for i in range(0, len(existing), self.images_per_request)
+            ]
+            for group, results in zip(groups, self.map_concurrent(describe_group, groups)):
+                for image_path, description in zip(group, results):
+                    if description is not None:
+                        descriptions[image_path] = description
+            # Images whose answer could not be parsed out are described one at a time
+            image_paths = [p for p in existing if p not in descriptions]
+        
+        # Results come back in input order, so each description maps to its own path
+        results = self.map_concurrent(describe, image_paths)
+        descriptions.update({
+            image_path: description
+            for image_path, description in zip(image_paths, results)
+            if description is not None
+        })
         return descriptions
+    
+    def _describe_group(self, image_paths: List[str]) -> List[Optional[str]]:
+        """Describe several images in one request; None for answers that can't be matched up"""
+        if len(image_paths) == 1:
+            return [None]
+        try:
+            result = self._post("/api/generate", {
+                "model": self.model_name,
+                "prompt": MULTI_DESCRIBE_PROMPT.format(count=len(image_paths)),
+                "images": [self._encode_image(image_path) for image_path in image_paths],
+                "stream": False
+            })
+            return parse_json_array(result['response'], len(image_paths))
+        except Exception as e:
+            print(f"Error describing {len(image_paths)} images: {str(e)}")
+            return [None] * len(image_paths)
 
     def generate_text(self, prompt: str, max_tokens: int = 500) -> str:
         """
@@ -120,35 +372,39 @@ class MultimodalLLM:
             Generated text response
         """
         try:
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json={
-                    "model": self.model_name,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "stream": False
-                }
-            )
-            response.raise_for_status()
-            result = response.json()
+            result = self._post("/api/chat", {
+                "model": self.model_name,
+                "messages": [{"role": "user", "content": prompt}],
+                "stream": False
+            })
             return result['message']['content'].strip()
         except Exception as e:
             print(f"Error generating text: {str(e)}")
             return ""
 
+    def embed(self, text: str, model: Optional[str] = None) -> List[float]:
+        """
+        Embed text with Ollama's embeddings endpoint.
+        
+        Args:
+            text: Text to embed
+            model: Embedding model (default: the client's model)
+            
+        Returns:
+            The embedding vector
+        """
+        result = self._post("/api/embeddings", {"model": model or self.model_name, "prompt": text})
+        return result["embedding"]
+
     def test_connection(self) -> bool:
         """Test basic connection to Ollama"""
         try:
             # Simple test request
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json={
-                    "model": self.model_name,
-                    "messages": [{"role": "user", "content": "Hello!"}],
-                    "stream": False
-                }
-            )
-            response.raise_for_status()
-            result = response.json()
+            result = self._post("/api/chat", {
+                "model": self.model_name,
+                "messages": [{"role": "user", "content": "Hello!"}],
+                "stream": False
+            })
             print("Successfully connected to Ollama")
             print("Test response:", result.get("message", {}).get("content", "")[:50] + "...")
             return True
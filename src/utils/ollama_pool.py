@@ -0,0 +1,158 @@
+import threading
+import time
+from typing import Dict, List, Optional, Set, Union
+
+
+def parse_endpoints(urls: Union[str, List[str]]) -> List[str]:
+    """Split a comma separated list of Ollama URLs, adding http:// where missing"""
+    if isinstance(urls, str):
+        urls = urls.split(",")
+    endpoints = []
+    for url in urls:
+        url = url.strip().rstrip("/")
+        if url:
+            endpoints.append(url if "://" in url else f"http://{url}")
+    return endpoints or ["http://localhost:11434"]
+
+
+class Endpoint:
+    """One Ollama server with its adaptive concurrency limit and health"""
+
+    def __init__(self, url: str, limit: float):
+        self.url = url
+        self.limit = limit
+        self.in_flight = 0
+        self.latency: Optional[float] = None  # EWMA over every request, for routing
+        self.baseline: Dict[str, float] = {}  # Typical fast latency per API path
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def available(self, now: float) -> bool:
+        return not self.ejected(now) and self.in_flight < max(1, int(self.limit))
+
+    def expected_wait(self) -> float:
+        # Unmeasured endpoints are tried first
+        return (self.in_flight + 1) / self.limit * (self.latency or 0.0)
+
+
+class EndpointPool:
+    """
+    Spread requests over several Ollama servers with AIMD concurrency control.
+
+    Each request goes to the available endpoint with the shortest expected wait,
+    estimated from its latency and the requests it already has in flight. Every
+    endpoint's concurrency limit grows by about one per window of fast responses
+    (additive increase) and halves on an error, a timeout or a response much slower
+    than usual for that API path (multiplicative decrease). An endpoint failing
+    ``eject_after`` times in a row is ejected for ``eject_seconds``, unless it is
+    the last one not ejected, so requests are never held back waiting for an
+    ejection to end. Once back it takes one request at a time, and a single
+    failure ejects it again.
+    """
+
+    def __init__(self, urls: Union[str, List[str]], max_concurrency: int = 4, min_concurrency: int = 1,
+                 slow_factor: float = 3.0, eject_after: int = 3, eject_seconds: float = 30.0):
+        """
+        Args:
+            urls: Ollama base URLs (a list, or a comma separated string)
+            max_concurrency: Upper bound on requests in flight per endpoint; also the starting limit
+            min_concurrency: Lower bound the limit is never decreased past
+            slow_factor: A response slower than this many times the path's usual latency counts as congestion
+            eject_after: Consecutive failures before an endpoint is taken out of rotation
+            eject_seconds: How long an ejected endpoint stays out before it is probed again
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.slow_factor = slow_factor
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.endpoints = [Endpoint(url, float(self.max_concurrency)) for url in parse_endpoints(urls)]
+        self._cond = threading.Condition()
+
+    @property
+    def capacity(self) -> int:
+        """Most requests that can be in flight across every endpoint"""
+        return self.max_concurrency * len(self.endpoints)
+
+    def acquire(self, exclude: Set[str] = frozenset()) -> Optional[Endpoint]:
+        """
+        Block until an endpoint has room, then reserve a slot on it.
+
+        Args:
+            exclude: URLs of endpoints not to use
+
+        Returns:
+            The endpoint, or None if every endpoint outside exclude is ejected
+        """
+        with self._cond:
+            while True:
+                now = time.time()
+                allowed = [e for e in self.endpoints if e.url not in exclude]
+                candidates = [e for e in allowed if e.available(now)]
+                if candidates:
+                    endpoint = min(candidates, key=Endpoint.expected_wait)
+                    endpoint.in_flight += 1
+                    return endpoint
+                if all(e.ejected(now) for e in allowed):
+                    return None
+                # Everything allowed is busy: wake up on a release
+                self._cond.wait()
+
+    def has_live(self, exclude: Set[str] = frozenset()) -> bool:
+        """Whether an endpoint outside exclude is in rotation"""
+        now = time.time()
+        with self._cond:
+            return any(e.url not in exclude and not e.ejected(now) for e in self.endpoints)
+
+    def release(self, endpoint: Endpoint, path: str, latency: Optional[float], ok: bool):
+        """
+        Return a slot and adjust the endpoint's limit from the outcome.
+
+        Args:
+            endpoint: Endpoint returned by acquire
+            path: API path that was called
+            latency: Seconds the request took (None if it never completed)
+            ok: Whether the request succeeded
+        """
+        with self._cond:
+            endpoint.in_flight -= 1
+            if ok and latency is not None:
+                endpoint.failures = 0
+                endpoint.latency = latency if endpoint.latency is None else 0.8 * endpoint.latency + 0.2 * latency
+                baseline = endpoint.baseline.get(path)
+                if baseline is not None and latency > self.slow_factor * baseline:
+                    self._decrease(endpoint)
+                else:
+                    endpoint.limit = min(self.max_concurrency, endpoint.limit + 1.0 / endpoint.limit)
+                # Tracks the fast end of the distribution, drifting up slowly if the path gets slower
+                endpoint.baseline[path] = latency if baseline is None else min(latency, 0.95 * baseline + 0.05 * latency)
+            else:
+                endpoint.failures += 1
+                self._decrease(endpoint)
+                now = time.time()
+                others_live = any(e is not endpoint and not e.ejected(now) for e in self.endpoints)
+                if endpoint.failures >= self.eject_after and others_live:
+                    endpoint.ejected_until = now + self.eject_seconds
+                    endpoint.limit = float(self.min_concurrency)
+                    # One more failure after the ejection ends takes it out again
+                    endpoint.failures = self.eject_after - 1
+                    print(f"Ollama endpoint {endpoint.url} failing, ejected for {self.eject_seconds:.0f}s")
+            self._cond.notify_all()
+
+    def _decrease(self, endpoint: Endpoint):
+        endpoint.limit = max(self.min_concurrency, endpoint.limit / 2)
+
+    def snapshot(self) -> List[dict]:
+        """Current state of every endpoint, for reporting"""
+        now = time.time()
+        with self._cond:
+            return [{
+                "url": e.url,
+                "limit": round(e.limit, 2),
+                "in_flight": e.in_flight,
+                "latency": e.latency,
+                "ejected": e.ejected(now),
+            } for e in self.endpoints]
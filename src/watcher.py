@@ -0,0 +1,148 @@
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+
+
+class FolderWatcher:
+    """
+    Report PPTX files in a directory once they have finished being written.
+
+    Changes are picked up through inotify (via the optional watchdog package)
+    or, without it, by polling the directory. A file is only reported after its
+    size and modification time have been stable for ``settle_seconds`` and it
+    reads as a complete zip archive, so half-copied uploads are never processed.
+    A file that is modified later is reported again.
+    """
+
+    def __init__(self, directory: Path, on_ready: Callable[[Path], None],
+                 settle_seconds: float = 2.0, poll_interval: float = 1.0,
+                 rescan_interval: float = 60.0):
+        """
+        Args:
+            directory: Directory to watch (not recursive)
+            on_ready: Called from the watcher thread with each file ready to process
+            settle_seconds: How long a file must stay unchanged before it is reported
+            poll_interval: Seconds between checks of pending files (and scans when polling)
+            rescan_interval: Seconds between full scans with inotify, to catch missed events
+        """
+        self.directory = Path(directory)
+        self.on_ready = on_ready
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pending: Set[Path] = set()
+        # path -> (size, mtime_ns) and when that signature was first seen
+        self._observed: Dict[Path, Tuple[Tuple[int, int], float]] = {}
+        # path -> signature it was last reported with
+        self._reported: Dict[Path, Tuple[int, int]] = {}
+        self._observer = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._observer is not None else "polling"
+
+    @staticmethod
+    def _wanted(path: Path) -> bool:
+        # Skip Office lock files (~$deck.pptx) and hidden temporary copies
+        return path.suffix.lower() == ".pptx" and not path.name.startswith(("~$", "."))
+
+    def start(self):
+        """Start watching; files already in the directory are reported once settled"""
+        self._observer = self._start_observer()
+        self._scan()
+        self._thread = threading.Thread(target=self._loop, name="slidesage-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _start_observer(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            print("watchdog not installed, polling the input directory. "
+                  "Install with: pip install -e \".[watch]\"")
+            return None
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                for path in (event.src_path, getattr(event, "dest_path", None)):
+                    if path:
+                        watcher._touch(Path(path))
+
+        observer = Observer()
+        observer.schedule(Handler(), str(self.directory), recursive=False)
+        observer.start()
+        return observer
+
+    def _touch(self, path: Path):
+        if self._wanted(path):
+            with self._lock:
+                self._pending.add(path)
+
+    def _scan(self):
+        try:
+            for path in self.directory.iterdir():
+                self._touch(path)
+        except OSError as e:
+            print(f"Could not scan {self.directory}: {str(e)}")
+
+    def _loop(self):
+        last_scan = time.time()
+        while not self._stop.wait(self.poll_interval):
+            if self._observer is None or time.time() - last_scan >= self.rescan_interval:
+                self._scan()
+                last_scan = time.time()
+            self._check()
+
+    def _check(self):
+        now = time.time()
+        with self._lock:
+            pending = list(self._pending)
+
+        for path in pending:
+            try:
+                stat = path.stat()
+            except OSError:
+                # Deleted or renamed away before it settled
+                with self._lock:
+                    self._pending.discard(path)
+                self._observed.pop(path, None)
+                continue
+
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self._reported.get(path) == signature:
+                with self._lock:
+                    self._pending.discard(path)
+                continue
+
+            observed = self._observed.get(path)
+            if observed is None or observed[0] != signature:
+                self._observed[path] = (signature, now)
+                continue
+            if now - observed[1] < self.settle_seconds or stat.st_size == 0:
+                continue
+            if not zipfile.is_zipfile(path):
+                # Still being written, or not a valid deck; reconsidered once it changes
+                continue
+
+            self._reported[path] = signature
+            with self._lock:
+                self._pending.discard(path)
+            self.on_ready(path)